@@ -0,0 +1,250 @@
+"""
+Benchmark offline dos fluxos de interação do bot, sem Discord.
+
+Executa os handlers reais (/cadastrar -> CadastroModal.on_submit -> ConfirmarCadastroButton,
+e /perfil) com Interactions falsas, contra um banco SQLite temporário e um servidor local que
+imita a API do Raider.IO com latência configurável. Reporta interações/s e p50/p95/p99 por etapa
+em níveis crescentes de concorrência. "on_submit" é o tempo até o defer() do modal e "validacao"
+o tempo até a confirmação chegar por follow-up, vinda do pool de trabalhos.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_interacoes.py --concorrencia 1,10,50 --usuarios 200 --latencia-ms 80
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "bot"))
+
+from aiohttp import web  # noqa: E402
+
+import bot as modulo_bot  # noqa: E402
+from banco import PoolConexoes  # noqa: E402
+from disponiveis import IndiceDisponiveis  # noqa: E402
+from estado import criar_estado  # noqa: E402
+from migracoes import aplicar_migracoes  # noqa: E402
+from raiderio_api import RaiderIOClient  # noqa: E402
+from trabalhos import PoolTrabalhos, TAMANHO_FILA  # noqa: E402
+
+CLASSES = ["Mage", "Priest", "Rogue", "Druid", "Hunter", "Shaman", "Warrior", "Paladin"]
+FUNCOES = ["Tank", "Healer", "DPS"]
+GUILD_BENCH = 1  # Servidor falso de todas as interações
+
+
+# --- Servidor falso do Raider.IO ---
+
+async def iniciar_stub_raiderio(latencia: float, porta: int) -> web.AppRunner:
+    async def profile(request: web.Request) -> web.Response:
+        if latencia:
+            await asyncio.sleep(latencia)
+        nome = request.query.get("name", "")
+        return web.json_response({
+            "name": nome,
+            "class": CLASSES[hash(nome) % len(CLASSES)],
+            "realm": request.query.get("realm", "Azralon").title(),
+            "mythic_plus_scores_by_season": [{"scores": {"all": random.uniform(500, 3500)}}],
+        })
+
+    app = web.Application()
+    app.router.add_get("/api/v1/characters/profile", profile)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", porta).start()
+    return runner
+
+
+# --- Interaction falsa ---
+
+class UsuarioFalso:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+
+
+class MensagemFalsa:
+    def __init__(self, embeds=None):
+        self.embeds = embeds or []
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class RespostaFalsa:
+    def __init__(self):
+        self.enviado = None
+        self._feito = False
+
+    def is_done(self) -> bool:
+        return self._feito
+
+    async def send_message(self, content=None, **kwargs):
+        self._feito = True
+        self.enviado = {"content": content, **kwargs}
+
+    async def edit_message(self, **kwargs):
+        self._feito = True
+        self.enviado = kwargs
+
+    async def send_modal(self, modal):
+        self._feito = True
+        self.enviado = {"modal": modal}
+
+    async def defer(self, **kwargs):
+        self._feito = True
+
+
+class FollowupFalso:
+    def __init__(self):
+        self.enviados = []
+        self.recebido = asyncio.Event()
+
+    async def send(self, content=None, **kwargs):
+        self.enviados.append({"content": content, **kwargs})
+        self.recebido.set()
+
+
+class InteractionFalsa:
+    def __init__(self, usuario: UsuarioFalso, mensagem: MensagemFalsa = None):
+        self.user = usuario
+        self.client = modulo_bot.bot
+        self.guild_id = GUILD_BENCH
+        self.response = RespostaFalsa()
+        self.followup = FollowupFalso()
+        self.message = mensagem or MensagemFalsa()
+
+
+# --- Fluxos ---
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[indice]
+
+
+async def cronometrar(latencias, etapa, coro):
+    inicio = perf_counter()
+    await coro
+    latencias.setdefault(etapa, []).append(perf_counter() - inicio)
+
+
+async def fluxo_usuario(user_id: int, latencias: dict, erros: list):
+    usuario = UsuarioFalso(user_id)
+    try:
+        inter = InteractionFalsa(usuario)
+        await cronometrar(latencias, "cadastrar", modulo_bot.cadastrar_slash.callback(inter))
+
+        # Os botões são DynamicItems: recriados a partir do custom_id, como no clique real
+        inter = InteractionFalsa(usuario)
+        await modulo_bot.IniciarCadastroButton(user_id).callback(inter)
+        modal = inter.response.enviado["modal"]
+        modal.nick_input._refresh_state(None, {"value": f"Bench{user_id}"})
+        modal.funcao_input._refresh_state(None, {"value": random.choice(FUNCOES)})
+        modal.raiderio_input._refresh_state(
+            None, {"value": f"https://raider.io/characters/us/azralon/Bench{user_id}"}
+        )
+
+        inter = InteractionFalsa(usuario)
+        inicio = perf_counter()
+        await cronometrar(latencias, "on_submit", modal.on_submit(inter))
+        if inter.response.enviado:
+            enviado = inter.response.enviado
+        else:
+            await asyncio.wait_for(inter.followup.recebido.wait(), 30)
+            latencias.setdefault("validacao", []).append(perf_counter() - inicio)
+            enviado = inter.followup.enviados[-1]
+        if enviado.get("embed") is None:
+            raise RuntimeError(f"on_submit não retornou confirmação: {enviado.get('content')}")
+
+        inter = InteractionFalsa(usuario, MensagemFalsa([enviado["embed"]]))
+        await cronometrar(latencias, "confirmar", modulo_bot.ConfirmarCadastroButton(user_id).callback(inter))
+
+        inter = InteractionFalsa(usuario)
+        await cronometrar(latencias, "perfil", modulo_bot.perfil_slash.callback(inter))
+    except Exception as e:
+        erros.append(f"{user_id}: {e!r}")
+
+
+async def rodada(concorrencia: int, usuarios: int, proximo_id: list):
+    latencias: dict = {}
+    erros: list = []
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def limitado(user_id):
+        async with semaforo:
+            await fluxo_usuario(user_id, latencias, erros)
+
+    ids = [proximo_id[0] + i for i in range(usuarios)]
+    proximo_id[0] += usuarios
+    inicio = perf_counter()
+    await asyncio.gather(*(limitado(uid) for uid in ids))
+    duracao = perf_counter() - inicio
+    return latencias, erros, duracao
+
+
+async def main(args):
+    diretorio = tempfile.mkdtemp(prefix="bench_bot_")
+    caminho_db = os.path.join(diretorio, "raiderio.db")
+
+    stub = await iniciar_stub_raiderio(args.latencia_ms / 1000, args.porta)
+    bot = modulo_bot.bot
+    bot.db = PoolConexoes(caminho_db, leitores=args.leitores)
+    await bot.db.abrir()
+    async with bot.db.escrita() as db:
+        await aplicar_migracoes(db)
+    bot.disponiveis = IndiceDisponiveis()
+    bot.estado = criar_estado(args.estado, caminho_db)
+    await bot.estado.abrir()
+    bot.raiderio = RaiderIOClient(api_url=f"http://127.0.0.1:{args.porta}/api/v1/characters/profile")
+    await bot.raiderio.iniciar()
+    bot.trabalhos = PoolTrabalhos(args.workers, TAMANHO_FILA)
+    bot.trabalhos.iniciar()
+
+    print(f"Banco temporário: {caminho_db}")
+    print(f"Latência simulada do Raider.IO: {args.latencia_ms} ms, estado: {args.estado}\n")
+    print(f"{'conc':>5} {'etapa':<10} {'n':>6} {'int/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    proximo_id = [10_000_000]
+    try:
+        for concorrencia in args.concorrencia:
+            latencias, erros, duracao = await rodada(concorrencia, args.usuarios, proximo_id)
+            total = sum(len(v) for etapa, v in latencias.items() if etapa != "validacao")
+            for etapa in ("cadastrar", "on_submit", "validacao", "confirmar", "perfil"):
+                valores = latencias.get(etapa, [])
+                print(
+                    f"{concorrencia:>5} {etapa:<10} {len(valores):>6} {len(valores) / duracao:>9.1f} "
+                    f"{percentil(valores, 50) * 1000:>9.2f} {percentil(valores, 95) * 1000:>9.2f} "
+                    f"{percentil(valores, 99) * 1000:>9.2f}"
+                )
+            print(f"{concorrencia:>5} {'total':<10} {total:>6} {total / duracao:>9.1f}  ({len(erros)} erros)")
+            for erro in erros[:5]:
+                print(f"      ! {erro}")
+    finally:
+        await bot.trabalhos.parar()
+        await bot.raiderio.fechar()
+        await bot.estado.fechar()
+        await bot.db.fechar()
+        await stub.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concorrencia", default="1,10,50,100",
+                        type=lambda v: [int(x) for x in v.split(",")],
+                        help="Níveis de concorrência separados por vírgula")
+    parser.add_argument("--usuarios", type=int, default=200, help="Usuários simulados por nível")
+    parser.add_argument("--latencia-ms", type=float, default=80, help="Latência do Raider.IO falso")
+    parser.add_argument("--leitores", type=int, default=4, help="Conexões de leitura no pool")
+    parser.add_argument("--estado", choices=("memoria", "sqlite"), default="memoria",
+                        help="Backend de cooldowns/cadastros em andamento")
+    parser.add_argument("--workers", type=int, default=8, help="Workers do pool de trabalhos")
+    parser.add_argument("--porta", type=int, default=18080, help="Porta do Raider.IO falso")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+import asyncio
+from time import monotonic, time
+from typing import Optional
+from raiderio_api import RaiderIOClient, RaiderIOIndisponivel
+from banco import PoolConexoes
+from disponiveis import IndiceDisponiveis
+
+# O Raider.IO permite 300 requisições/minuto por IP sem chave de API.
+# O atualizador usa só parte desse orçamento para sobrar espaço às interações dos usuários.
+REQUISICOES_POR_MINUTO = 120
+RAJADA_MAXIMA = 10  # Requisições que podem sair de uma vez após um período ocioso
+CONCORRENCIA = 5  # Requisições simultâneas no máximo
+TAMANHO_LOTE = 50  # Linhas gravadas por transação
+INTERVALO_CICLO_SEGUNDOS = 1800  # Pausa entre duas passadas completas pelo roster
+
+
+class TokenBucket:
+    """Balde de tokens: libera `taxa` tokens por segundo, acumulando até `capacidade`"""
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado_em = monotonic()
+        self._lock = asyncio.Lock()
+
+    def _repor(self) -> None:
+        agora = monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    async def adquirir(self) -> None:
+        """Aguarda até haver um token disponível e o consome"""
+        async with self._lock:
+            self._repor()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+                self._repor()
+            self.tokens -= 1
+
+
+class AtualizadorScores:
+    """
+    Atualiza em segundo plano o score de todos os personagens cadastrados.
+    Percorre o roster do mais desatualizado para o mais recente, com concorrência limitada
+    e respeitando um token bucket, e grava os resultados em lotes.
+    """
+    def __init__(
+        self,
+        db: PoolConexoes,
+        raiderio: RaiderIOClient,
+        indice: Optional[IndiceDisponiveis] = None,
+        requisicoes_por_minuto: int = REQUISICOES_POR_MINUTO,
+        concorrencia: int = CONCORRENCIA,
+        tamanho_lote: int = TAMANHO_LOTE,
+        intervalo: float = INTERVALO_CICLO_SEGUNDOS
+    ):
+        self.db = db
+        self.raiderio = raiderio
+        self.indice = indice
+        self.bucket = TokenBucket(requisicoes_por_minuto / 60, RAJADA_MAXIMA)
+        self.concorrencia = concorrencia
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.task: Optional[asyncio.Task] = None
+
+    def iniciar(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._loop())
+
+    async def parar(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                inicio = monotonic()
+                atualizados = await self.executar_ciclo()
+                print(f"[ATUALIZADOR] {atualizados} personagens atualizados em {monotonic() - inicio:.1f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERRO ATUALIZADOR] {e}")
+            await asyncio.sleep(self.intervalo)
+
+    async def executar_ciclo(self) -> int:
+        """Faz uma passada completa pelo roster e retorna quantos scores foram gravados"""
+        personagens = await self.db.buscar_todos("""
+            SELECT id, raiderio_url FROM jogadores
+            WHERE raiderio_url IS NOT NULL AND raiderio_url != ''
+            ORDER BY ultima_atualizacao ASC
+        """)
+
+        fila: asyncio.Queue = asyncio.Queue()
+        for personagem in personagens:
+            fila.put_nowait(personagem)
+
+        lote = []
+        total = 0
+
+        async def worker():
+            nonlocal total
+            while True:
+                try:
+                    personagem_id, url = fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.bucket.adquirir()
+                try:
+                    score, _, _ = await self.raiderio.obter_score(url, forcar=True)
+                except RaiderIOIndisponivel as e:
+                    # Com a API fora do ar o resto da passada falharia igual; fica para o próximo ciclo
+                    print(f"[ATUALIZADOR] Raider.IO indisponível ({e}), interrompendo a passada")
+                    while not fila.empty():
+                        fila.get_nowait()
+                    return
+                if score is None:
+                    continue
+                agora = int(time())
+                lote.append((score, agora, personagem_id))
+                if len(lote) >= self.tamanho_lote:
+                    total += await self._gravar_lote(lote)
+
+        await asyncio.gather(*(worker() for _ in range(self.concorrencia)))
+        total += await self._gravar_lote(lote)
+        return total
+
+    async def _gravar_lote(self, lote: list) -> int:
+        """Grava e esvazia o lote em uma única transação"""
+        if not lote:
+            return 0
+        linhas = lote[:]
+        lote.clear()
+        async with self.db.escrita() as db:
+            await db.executemany(
+                "UPDATE jogadores SET raiderio_score = ?, ultima_atualizacao = ? WHERE id = ?",
+                linhas
+            )
+            if self.indice is not None:
+                for score, _, personagem_id in linhas:
+                    self.indice.atualizar_score(personagem_id, score)
+        return len(linhas)
@@ -0,0 +1,131 @@
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, List, Optional
+from metricas import SQLITE_SEGUNDOS
+
+DB_PATH = "data/raiderio.db"
+LEITORES_PADRAO = 4  # Conexões de leitura mantidas abertas
+
+# Ajustes aplicados a cada conexão
+JOURNAL_MODE = "WAL"  # Leitores não esperam pelas escritas
+SYNCHRONOUS = "NORMAL"  # Com WAL, fsync só no checkpoint; seguro contra corrupção
+CACHE_KB = 16384  # Cache de páginas por conexão
+MMAP_BYTES = 256 * 1024 * 1024  # Leituras via mmap em vez de read()
+BUSY_TIMEOUT_MS = 5000  # Espera por locks antes de falhar com "database is locked"
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+class PoolConexoes:
+    """
+    Pool de conexões SQLite de longa duração.
+    Várias conexões de leitura são usadas em paralelo; todas as escritas passam por
+    uma única conexão, serializada por um lock, que faz commit ao final do bloco.
+    Com journal WAL, as leituras continuam enquanto uma escrita está em andamento.
+    """
+    def __init__(
+        self,
+        caminho: str = DB_PATH,
+        leitores: int = LEITORES_PADRAO,
+        journal_mode: str = JOURNAL_MODE,
+        synchronous: str = SYNCHRONOUS,
+        cache_kb: int = CACHE_KB,
+        mmap_bytes: int = MMAP_BYTES,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS
+    ):
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode inválido: {journal_mode}")
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous inválido: {synchronous}")
+
+        self.caminho = caminho
+        self.num_leitores = leitores
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_kb = int(cache_kb)
+        self.mmap_bytes = int(mmap_bytes)
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self._leitores: asyncio.Queue = asyncio.Queue()
+        self._todas: List[aiosqlite.Connection] = []
+        self._escritor: Optional[aiosqlite.Connection] = None
+        self._lock_escrita = asyncio.Lock()
+
+    async def _conectar(self, somente_leitura: bool = False) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.caminho, timeout=self.busy_timeout_ms / 1000)
+        await conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        await conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        await conn.execute(f"PRAGMA cache_size = -{self.cache_kb}")
+        await conn.execute(f"PRAGMA mmap_size = {self.mmap_bytes}")
+        await conn.execute("PRAGMA temp_store = MEMORY")
+        if somente_leitura:
+            await conn.execute("PRAGMA query_only = 1")
+        self._todas.append(conn)
+        return conn
+
+    async def abrir(self) -> None:
+        self._escritor = await self._conectar()
+        # journal_mode é persistente no arquivo; basta definir pela conexão de escrita
+        cursor = await self._escritor.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        modo = (await cursor.fetchone())[0]
+        if modo.upper() != self.journal_mode:
+            print(f"[BANCO] journal_mode {self.journal_mode} não aplicado, usando {modo}")
+        for _ in range(self.num_leitores):
+            self._leitores.put_nowait(await self._conectar(somente_leitura=True))
+
+    async def fechar(self) -> None:
+        if self._escritor:
+            try:
+                # Atualiza estatísticas do planejador de consultas antes de sair
+                await self._escritor.execute("PRAGMA optimize")
+            except Exception as e:
+                print(f"[ERRO BANCO] PRAGMA optimize: {e}")
+        for conn in self._todas:
+            try:
+                await conn.close()
+            except Exception as e:
+                print(f"[ERRO BANCO] Ao fechar conexão: {e}")
+        self._todas.clear()
+        self._leitores = asyncio.Queue()
+        self._escritor = None
+
+    @asynccontextmanager
+    async def leitura(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Empresta uma conexão de leitura do pool"""
+        conn = await self._leitores.get()
+        try:
+            with SQLITE_SEGUNDOS.cronometrar(operacao="leitura"):
+                yield conn
+        finally:
+            self._leitores.put_nowait(conn)
+
+    @asynccontextmanager
+    async def escrita(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Usa a conexão de escrita com exclusividade; commit no fim ou rollback em caso de erro"""
+        async with self._lock_escrita:
+            with SQLITE_SEGUNDOS.cronometrar(operacao="escrita"):
+                try:
+                    yield self._escritor
+                    await self._escritor.commit()
+                except BaseException:
+                    await self._escritor.rollback()
+                    raise
+
+    async def buscar_um(self, sql: str, params: Iterable = ()) -> Optional[tuple]:
+        async with self.leitura() as conn:
+            cursor = await conn.execute(sql, params)
+            return await cursor.fetchone()
+
+    async def buscar_todos(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        async with self.leitura() as conn:
+            cursor = await conn.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def executar(self, sql: str, params: Iterable = ()) -> int:
+        """Executa uma escrita isolada e retorna o número de linhas afetadas"""
+        async with self.escrita() as conn:
+            cursor = await conn.execute(sql, params)
+            return cursor.rowcount
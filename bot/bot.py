@@ -1,28 +1,50 @@
 import discord
 import os
 import asyncio
-import aiosqlite
 import aiohttp
-from datetime import datetime, timedelta
+import hashlib
+import io
+import json
 from discord.ext import commands
-from discord.ui import View, Select, Modal, TextInput, Button
+from discord.ui import View, Select, Modal, TextInput, Button, DynamicItem
 from dotenv import load_dotenv
 from typing import Optional, Dict, Set
 from discord import app_commands
-from time import time
-import weakref
-import gc
-from raiderio_api import obter_score_raiderio
+from contextlib import contextmanager
+from time import perf_counter, time
+import shutil
+import sqlite3
+import tempfile
+from raiderio_api import RaiderIOClient, RaiderIOIndisponivel, CircuitBreaker
+from atualizador import AtualizadorScores
+from banco import PoolConexoes
+from migracoes import aplicar_migracoes
+from disponiveis import IndiceDisponiveis, buscar_pagina_disponiveis
+from config_guild import ConfigGuild, ConfigGuilds
+from codigos import ARMADURAS, CLASSES, FUNCOES
+from grupos import formar_grupos
+from embeds import COLUNAS_PERFIL, COLUNAS_RESUMO, ResumoPersonagem, embed_perfil, embed_lista_personagens, icone_funcao
+from embeds import estatisticas_cache as estatisticas_embeds, embed_boas_vindas, hash_embed
+from historico import buscar_historico, compactar_historico, sparkline, SEGUNDOS_DIA
+from estado import criar_estado
+from trabalhos import PoolTrabalhos
+from roster import exportar_roster, gravar_exportacao, ler_roster, importar_roster, formato_do_arquivo, resumo_importacao
+from memoria import MonitorMemoria
+from metricas import registro as registro_metricas, medir_interacao, Medidor, ServidorMetricas, INICIALIZACAO_SEGUNDOS
 from mensagens import (
-    BOAS_VINDAS, CADASTRO_SUCESSO, ERRO_CADASTRO, LIMITE_PERSONAGENS, FUNCAO_INVALIDA,
+    CADASTRO_SUCESSO, ERRO_CADASTRO, LIMITE_PERSONAGENS, FUNCAO_INVALIDA,
     RATE_LIMIT, PERSONAGEM_EXISTENTE, RAIDERIO_INVALIDO, PERFIL_VAZIO, CADASTRO_EM_ANDAMENTO,
     CADASTRO_CANCELADO, PERSONAGEM_REMOVIDO, PERSONAGEM_NAO_ENCONTRADO, ERRO_GERAL,
     ERRO_ATUALIZAR_RAIDERIO, ERRO_ATUALIZAR_DISPONIBILIDADE, ERRO_DELETAR_PERSONAGEM,
-    ERRO_CARREGAR_PERSONAGEM, ERRO_INICIAR_CADASTRO, SISTEMA_SOBRECARGADO, CADASTRO_CONCLUIDO,
+    ERRO_CARREGAR_PERSONAGEM, ERRO_INICIAR_CADASTRO, SISTEMA_SOBRECARGADO,
     MUITAS_INTERACOES, SESSAO_EXPIRADA, SEM_PERMISSAO_VIEW, AGUARDE_BOTAO, AGUARDE_RAIDERIO,
-    NAO_POSSIVEL_ATUALIZAR_SCORE, LINK_RAIDERIO_NAO_ENCONTRADO
+    NAO_POSSIVEL_ATUALIZAR_SCORE, LINK_RAIDERIO_NAO_ENCONTRADO, SEM_GRUPOS, ERRO_FORMAR_GRUPOS,
+    SEM_DISPONIVEIS, ERRO_LISTAR_DISPONIVEIS, SEM_PERMISSAO_COMANDO, RAIDERIO_INDISPONIVEL,
+    SEM_HISTORICO, ERRO_HISTORICO, CONFIGURACAO_SALVA, ERRO_CONFIGURAR, ROSTER_VAZIO, ROSTER_EXPORTADO,
+    ERRO_EXPORTAR, ROSTER_FORMATO_INVALIDO, ROSTER_IMPORTADO, ERRO_IMPORTAR
 )
 
+# Canal de instruções do servidor original; os demais servidores usam /configurar
 INSTRUCOES_CANAL_ID = 1394566723448995982
 BOASVINDAS_MSG_ID_FILE = "bot/mensagens/boasvindas_msg_id.txt"
 # Carrega variáveis de ambiente
@@ -30,56 +52,47 @@ load_dotenv()
 RAIDERIO_COOLDOWN_SECONDS = 300
 BUTTON_COOLDOWN_SECONDS = 30
 MAX_ATTEMPTS_PER_HOUR = 5  # Máximo de tentativas por hora
-MAX_ACTIVE_VIEWS = 50  # Máximo de views ativas por vez
-
-# Dicionários para controle
-raiderio_cooldowns = {}
-button_cooldowns = {}
-active_cadastros = {}
-failed_attempts = {}  # user_id: [(timestamp, tipo_falha), ...]
-active_views_count = 0
-view_registry = weakref.WeakSet()  # Registro fraco para cleanup automático
+MAX_INTERACOES_CADASTRO = 20  # Cliques nos botões de cadastro por usuário a cada CADASTRO_TTL_SECONDS
+MAX_GRUPOS_EMBED = 10  # Grupos exibidos por resposta do /grupos
+DISPONIVEIS_POR_PAGINA = 10  # Jogadores por página do /disponiveis
+RAIDERIO_CACHE_TTL = int(os.getenv("RAIDERIO_CACHE_TTL", "180"))  # Segundos de perfil fresco no cache
+RAIDERIO_CACHE_STALE = int(os.getenv("RAIDERIO_CACHE_STALE", "900"))  # Segundos servindo perfil velho enquanto revalida
+RAIDERIO_CACHE_MAX = int(os.getenv("RAIDERIO_CACHE_MAX", "2048"))  # Máximo de perfis no cache
+RAIDERIO_TIMEOUT = float(os.getenv("RAIDERIO_TIMEOUT", "5"))  # Segundos por requisição ao Raider.IO
+RAIDERIO_TENTATIVAS = int(os.getenv("RAIDERIO_TENTATIVAS", "3"))  # Tentativas em 429/5xx/timeout
+RAIDERIO_CIRCUITO_FALHAS = int(os.getenv("RAIDERIO_CIRCUITO_FALHAS", "5"))  # Falhas seguidas que abrem o circuito
+RAIDERIO_CIRCUITO_SEGUNDOS = int(os.getenv("RAIDERIO_CIRCUITO_SEGUNDOS", "30"))  # Tempo com o circuito aberto
+ATUALIZADOR_RPM = int(os.getenv("ATUALIZADOR_RPM", "120"))  # Requisições/minuto do atualizador em segundo plano
+ATUALIZADOR_INTERVALO = int(os.getenv("ATUALIZADOR_INTERVALO", "1800"))  # Segundos entre passadas pelo roster
+DB_PATH = "data/raiderio.db"
+DB_LEITORES = int(os.getenv("DB_LEITORES", "4"))  # Conexões de leitura no pool do SQLite
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))  # Cache de páginas por conexão
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))  # 0 desativa mmap
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+MEMORIA_TRACEMALLOC = os.getenv("MEMORIA_TRACEMALLOC", "0") == "1"  # Liga o tracemalloc desde o início
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "9108"))  # 0 desativa o endpoint /metrics
+HISTORICO_COMPACTAR_HORAS = int(os.getenv("HISTORICO_COMPACTAR_HORAS", "24"))  # Intervalo da compactação do histórico
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None  # Vazio/0: o Discord recomenda a quantidade
+SYNC_COMANDOS = os.getenv("SYNC_COMANDOS", "auto")  # auto: só quando a árvore muda; sempre; nunca
+ESTADO_BACKEND = os.getenv("ESTADO_BACKEND", "memoria")  # memoria: só este processo; sqlite: compartilhado entre processos
+TRABALHOS_WORKERS = int(os.getenv("TRABALHOS_WORKERS", "8"))  # Workers do pool de trabalhos das interações
+TRABALHOS_FILA = int(os.getenv("TRABALHOS_FILA", "200"))  # Trabalhos aguardando antes de recusar novos
+ROSTER_LIMITE_ANEXO = 10 * 1024 * 1024  # Tamanho de cada parte do /exportar quando o limite do servidor não é conhecido
+CADASTRO_TTL_SECONDS = 600  # Um cadastro abandonado libera o usuário depois disso
+
+# Estruturas de controle
+# Cooldowns, cadastros em andamento, tentativas falhadas e cliques nos menus ficam em bot.estado
+# (espaços "raiderio", "botao", "cadastro", "falhas" e "interacoes"), compartilhado entre processos.
+# Os menus em si não guardam estado: veja os DynamicItems abaixo.
 
 # --- FUNÇÕES DE SEGURANÇA ---
 
-def limpar_cooldowns_expirados():
-    """Remove cooldowns expirados para liberar memória"""
-    now = time()
-    
-    # Limpa cooldowns do Raider.IO expirados
-    expired_keys = [k for k, v in raiderio_cooldowns.items() if now - v > RAIDERIO_COOLDOWN_SECONDS]
-    for key in expired_keys:
-        del raiderio_cooldowns[key]
-    
-    # Limpa cooldowns de botões expirados
-    expired_keys = [k for k, v in button_cooldowns.items() if now - v > BUTTON_COOLDOWN_SECONDS]
-    for key in expired_keys:
-        del button_cooldowns[key]
-    
-    # Limpa tentativas falhadas antigas (mais de 1 hora)
-    for user_id in list(failed_attempts.keys()):
-        failed_attempts[user_id] = [
-            (timestamp, tipo) for timestamp, tipo in failed_attempts[user_id]
-            if now - timestamp < 3600
-        ]
-        if not failed_attempts[user_id]:
-            del failed_attempts[user_id]
-
-def registrar_tentativa_falhada(user_id: int, tipo_falha: str) -> bool:
+async def registrar_tentativa_falhada(user_id: int, tipo_falha: str) -> bool:
     """Registra tentativa falhada e verifica se usuário excedeu limite"""
-    now = time()
-    if user_id not in failed_attempts:
-        failed_attempts[user_id] = []
-    
-    failed_attempts[user_id].append((now, tipo_falha))
-    
-    # Remove tentativas antigas (mais de 1 hora)
-    failed_attempts[user_id] = [
-        (timestamp, tipo) for timestamp, tipo in failed_attempts[user_id]
-        if now - timestamp < 3600
-    ]
-    
-    return len(failed_attempts[user_id]) >= MAX_ATTEMPTS_PER_HOUR
+    return await bot.estado.janela_registrar("falhas", user_id, MAX_ATTEMPTS_PER_HOUR, 3600)
 
 def validar_entrada_usuario(texto: str, max_len: int = 100) -> str:
     """Valida e sanitiza entrada do usuário"""
@@ -97,12 +110,7 @@ def validar_entrada_usuario(texto: str, max_len: int = 100) -> str:
 async def verificar_rate_limit(user_id: int, acao: str) -> bool:
     """Verifica se usuário está sendo rate limited"""
     key = f"{user_id}:{acao}"
-    now = time()
-    
-    if key not in raiderio_cooldowns:
-        return False
-        
-    return now - raiderio_cooldowns[key] < RAIDERIO_COOLDOWN_SECONDS
+    return await bot.estado.cooldown_restante("raiderio", key) > 0
 
 # Add this function near the top of your file with other helper functions
 def get_armor_type(class_name: str) -> str:
@@ -125,78 +133,90 @@ def get_armor_type(class_name: str) -> str:
     else:
         return "Unknown"
 
-# --- CLASSES DE VIEW COM PROTEÇÃO MELHORADA ---
+# --- COMPONENTES PERSISTENTES ---
+# Os botões são DynamicItems: o estado (usuário, personagem, ação) vai no custom_id e as classes
+# são registradas uma vez no setup_hook. Nenhum objeto fica em memória por menu aberto e os
+# botões continuam funcionando depois de um reinício.
+
+def componentes(*itens) -> View:
+    """
+    View usada só como layout da mensagem. Ela é parada antes do envio, então o discord.py
+    não a guarda no ViewStore; os cliques chegam pelos DynamicItems registrados.
+    """
+    view = View(timeout=None)
+    for item in itens:
+        view.add_item(item)
+    view.stop()
+    return view
+
+async def desabilitar_botoes(interaction: discord.Interaction) -> None:
+    """Desabilita os botões da mensagem clicada, reconstruindo a view a partir da própria mensagem"""
+    try:
+        view = View.from_message(interaction.message, timeout=None)
+        for item in view.children:
+            item.disabled = True
+        view.stop()
+        await interaction.message.edit(view=view)
+    except Exception:
+        pass  # Ignora erro se a mensagem não existir mais
+
+def idade_mensagem(interaction: discord.Interaction) -> float:
+    if interaction.message is None:
+        return 0
+    return (discord.utils.utcnow() - interaction.message.created_at).total_seconds()
+
+class ItemPrivado:
+    """Mixin dos DynamicItems que só o dono do menu (user_id do custom_id) pode usar"""
+    user_id: int
 
-class PrivateView(View):
-    """Classe base para todas as views privadas com proteção melhorada"""
-    def __init__(self, interaction):
-        super().__init__(timeout=300)
-        self.autor_id = interaction.user.id
-        self.criado_em = time()
-        self.interacoes_count = 0
-        self.max_interacoes = 20  # Máximo de interações por view
-        
-        # Registra a view para cleanup
-        view_registry.add(self)
-        global active_views_count
-        active_views_count += 1
-    
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        # Verifica ownership
-        if interaction.user.id != self.autor_id:
-            await interaction.response.send_message(
-                "🚫 Você não pode interagir com este menu! Use `/cadastrar` para iniciar seu próprio cadastro.",
-                ephemeral=True
-            )
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message(SEM_PERMISSAO_VIEW, ephemeral=True)
             return False
-        
-        # Verifica rate limiting
-        self.interacoes_count += 1
-        if self.interacoes_count > self.max_interacoes:
-            await interaction.response.send_message(
-                "⚠️ Muitas interações. Por favor, reinicie o processo.",
-                ephemeral=True
-            )
+        return True
+
+class ItemCadastro(ItemPrivado):
+    """Botões do fluxo de cadastro: além do dono, limitam interações e expiram com a sessão"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not await super().interaction_check(interaction):
             return False
-        
-        # Verifica se view não está muito antiga
-        if time() - self.criado_em > 600:  # 10 minutos
-            await interaction.response.send_message(
-                "⏰ Esta sessão expirou. Por favor, inicie novamente.",
-                ephemeral=True
-            )
+
+        # Verifica rate limiting; a janela acusa ao atingir o limite, então +1 deixa passar
+        # exatamente MAX_INTERACOES_CADASTRO cliques e recusa o seguinte
+        if await interaction.client.estado.janela_registrar(
+            "interacoes", self.user_id, MAX_INTERACOES_CADASTRO + 1, CADASTRO_TTL_SECONDS
+        ):
+            await interaction.response.send_message(MUITAS_INTERACOES, ephemeral=True)
             return False
-        
+
+        # Verifica se a mensagem não está muito antiga
+        if idade_mensagem(interaction) > CADASTRO_TTL_SECONDS:
+            await interaction.response.send_message(SESSAO_EXPIRADA, ephemeral=True)
+            return False
+
         return True
-    
-    def stop(self):
-        super().stop()
-        global active_views_count
-        active_views_count = max(0, active_views_count - 1)
-
-class CadastroView(PrivateView):
-    def __init__(self, interaction: discord.Interaction):
-        super().__init__(interaction)
-        self.interaction = interaction
-        self.user_id = str(interaction.user.id)
-        self.nome = interaction.user.display_name
-        
-        # Atributos que serão preenchidos durante o cadastro
-        self.personagem_nome = None
-        self.personagem_classe = None
-        self.funcao = None
-        self.armadura = None
-        self.raiderio_url = None
-        self.raiderio_score = None
-
-    @discord.ui.button(label="📝 Iniciar Cadastro", style=discord.ButtonStyle.primary)
-    async def iniciar_cadastro(self, interaction: discord.Interaction, button: Button):
+
+class IniciarCadastroButton(ItemCadastro, DynamicItem[Button], template=r"bm:cadastro:iniciar:(?P<user_id>[0-9]+)"):
+    def __init__(self, user_id: int):
+        super().__init__(Button(
+            label="📝 Iniciar Cadastro",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"bm:cadastro:iniciar:{user_id}"
+        ))
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(int(match["user_id"]))
+
+    @medir_interacao("botao", "IniciarCadastroButton")
+    async def callback(self, interaction: discord.Interaction):
         try:
             # Verifica limite de personagens
-            async with aiosqlite.connect("data/raiderio.db") as db:
+            async with interaction.client.db.leitura() as db:
                 cursor = await db.execute(
-                    "SELECT COUNT(*) FROM jogadores WHERE user_id = ?",
-                    (self.user_id,)
+                    "SELECT COUNT(*) FROM jogadores WHERE user_id = ? AND guild_id = ?",
+                    (self.user_id, interaction.guild_id)
                 )
                 count = (await cursor.fetchone())[0]
                 
@@ -207,7 +227,7 @@ class CadastroView(PrivateView):
                     )
 
             # Abre modal de cadastro
-            modal = CadastroModal(self)
+            modal = CadastroModal(interaction.guild_id)
             await interaction.response.send_modal(modal)
 
         except Exception as e:
@@ -217,26 +237,33 @@ class CadastroView(PrivateView):
                 ephemeral=True
             )
 
-    @discord.ui.button(label="❌ Cancelar", style=discord.ButtonStyle.danger)
-    async def cancelar(self, interaction: discord.Interaction, button: Button):
-        # Desabilita os botões
-        for item in self.children:
-            item.disabled = True
-        try:
-            await interaction.message.edit(view=self)
-        except Exception:
-            pass  # Ignora erro se a mensagem não existir mais
+class CancelarCadastroButton(ItemCadastro, DynamicItem[Button], template=r"bm:cadastro:cancelar:(?P<user_id>[0-9]+)"):
+    def __init__(self, user_id: int):
+        super().__init__(Button(
+            label="❌ Cancelar",
+            style=discord.ButtonStyle.danger,
+            custom_id=f"bm:cadastro:cancelar:{user_id}"
+        ))
+        self.user_id = user_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(int(match["user_id"]))
+
+    @medir_interacao("botao", "CancelarCadastroButton")
+    async def callback(self, interaction: discord.Interaction):
+        await desabilitar_botoes(interaction)
         await interaction.response.send_message(
             CADASTRO_CANCELADO,
             ephemeral=True
         )
-        active_cadastros.pop(interaction.user.id, None)
+        await interaction.client.estado.liberar("cadastro", interaction.user.id)
 
 class CadastroModal(Modal, title="Cadastro de Personagem"):
-    def __init__(self, cadastro_view):
-        super().__init__()
-        self.cadastro_view = cadastro_view
+    def __init__(self, guild_id: int):
+        # O modal é o único objeto do cadastro que fica em memória, e só até ser enviado ou expirar
+        super().__init__(timeout=CADASTRO_TTL_SECONDS)
+        self.guild_id = guild_id
         
         self.nick_input = TextInput(
             label="Nick do personagem",
@@ -263,7 +290,9 @@ class CadastroModal(Modal, title="Cadastro de Personagem"):
         self.add_item(self.funcao_input)
         self.add_item(self.raiderio_input)
 
+    @medir_interacao("modal", "CadastroModal")
     async def on_submit(self, interaction: discord.Interaction):
+        # Só validações locais antes de responder; banco e Raider.IO ficam para o trabalho em segundo plano
         try:
             # Validar entrada
             nick = validar_entrada_usuario(self.nick_input.value)
@@ -284,145 +313,156 @@ class CadastroModal(Modal, title="Cadastro de Personagem"):
                 )
                 
             raiderio_url = validar_entrada_usuario(self.raiderio_input.value)
-            
-            # Validar função
-            if funcao not in ["Tank", "Healer", "DPS"]:
-                return await interaction.response.send_message(
-                    FUNCAO_INVALIDA,
-                    ephemeral=True
-                )
-            
-            # Verificar rate limit
-            if await verificar_rate_limit(interaction.user.id, "cadastro"):
-                return await interaction.response.send_message(
-                    RATE_LIMIT,
+        except ValueError:
+            return await interaction.response.send_message(
+                ERRO_GERAL,
+                ephemeral=True
+            )
+
+        # Confirma a interação dentro dos 3 segundos; o resultado chega por follow-up
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        enfileirado = interaction.client.trabalhos.enviar(
+            "cadastro",
+            lambda: self.validar(interaction, nick, funcao, raiderio_url),
+            ao_falhar=lambda: interaction.followup.send(ERRO_GERAL, ephemeral=True)
+        )
+        if not enfileirado:
+            await interaction.followup.send(SISTEMA_SOBRECARGADO, ephemeral=True)
+
+    async def validar(self, interaction: discord.Interaction, nick: str, funcao: str, raiderio_url: str):
+        """Checagens no banco e no Raider.IO; roda no pool de trabalhos e responde por follow-up"""
+        # Verificar rate limit
+        if await verificar_rate_limit(interaction.user.id, "cadastro"):
+            return await interaction.followup.send(
+                RATE_LIMIT,
+                ephemeral=True
+            )
+        
+        # Verificar limite de personagens
+        async with interaction.client.db.leitura() as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*) FROM jogadores WHERE user_id = ? AND guild_id = ?",
+                (interaction.user.id, self.guild_id)
+            )
+            count = (await cursor.fetchone())[0]
+            if count >= 4:  # Permite até 4 personagens
+                return await interaction.followup.send(
+                    LIMITE_PERSONAGENS,
                     ephemeral=True
                 )
             
-            # Verificar limite de personagens
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                cursor = await db.execute(
-                    "SELECT COUNT(*) FROM jogadores WHERE user_id = ?",
-                    (str(interaction.user.id),)
-                )
-                count = (await cursor.fetchone())[0]
-                if count >= 4:  # Permite até 4 personagens
-                    return await interaction.response.send_message(
-                        LIMITE_PERSONAGENS,
-                        ephemeral=True
-                    )
-                
-                # Verificar se personagem já existe
-                cursor = await db.execute(
-                    "SELECT user_id FROM jogadores WHERE LOWER(personagem_nome) = LOWER(?)",
-                    (nick,)
-                )
-                existing = await cursor.fetchone()
-                if existing and str(existing[0]) != str(interaction.user.id):
-                    return await interaction.response.send_message(
-                        PERSONAGEM_EXISTENTE,
-                        ephemeral=True
-                    )
-            
-            # Validar com Raider.IO e obter score atual
-            score, classe, server = await obter_score_raiderio(raiderio_url)
-            if score is None or classe is None:
-                return await interaction.response.send_message(
-                    RAIDERIO_INVALIDO,
+            # Verificar se personagem já existe
+            cursor = await db.execute(
+                "SELECT user_id FROM jogadores WHERE guild_id = ? AND LOWER(personagem_nome) = LOWER(?)",
+                (self.guild_id, nick)
+            )
+            existing = await cursor.fetchone()
+            if existing and existing[0] != interaction.user.id:
+                return await interaction.followup.send(
+                    PERSONAGEM_EXISTENTE,
                     ephemeral=True
                 )
-
-            armadura = get_armor_type(classe)
-
-            # Update the confirmation embed to show armor type
-            embed = discord.Embed(
-                title="📝 Confirmar Cadastro",
-                description="Verifique os dados antes de confirmar:",
-                color=discord.Color.blue()
-            )
-            embed.add_field(name="Personagem", value=nick, inline=True)
-            embed.add_field(name="Classe", value=classe, inline=True)
-            embed.add_field(name="Função", value=funcao, inline=True)
-            embed.add_field(name="Armadura", value=f"{armadura}", inline=True)  # Added this line
-            embed.add_field(name="Score M+", value=f"{score:.1f}", inline=True)
-            embed.add_field(name="Raider.IO", value=f"[Link]({raiderio_url})", inline=False)
-            embed.add_field(name="Servidor", value=server, inline=True)
-
-            # Store armor type in cadastro_view
-            self.cadastro_view.armadura = armadura
-            self.cadastro_view.personagem_nome = nick
-            self.cadastro_view.personagem_classe = classe
-            self.cadastro_view.funcao = funcao
-            self.cadastro_view.raiderio_url = raiderio_url
-            self.cadastro_view.raiderio_score = score
-            self.cadastro_view.personagem_server = server  # <-- ADICIONE ESTA LINHA
-
-            await interaction.response.send_message(
-                embed=embed,
-                view=ConfirmarCadastroView(interaction, self.cadastro_view),
+        
+        # Validar com Raider.IO e obter score atual
+        try:
+            score, classe, server = await interaction.client.raiderio.obter_score(raiderio_url)
+        except RaiderIOIndisponivel:
+            return await interaction.followup.send(
+                RAIDERIO_INDISPONIVEL,
                 ephemeral=True
             )
-            
-        except Exception as e:
-            print(f"[ERRO CADASTRO] {e}")
-            await interaction.response.send_message(
-                ERRO_GERAL,
+        if score is None or classe is None:
+            return await interaction.followup.send(
+                RAIDERIO_INVALIDO,
                 ephemeral=True
             )
 
-class ConfirmarCadastroView(View):
-    def __init__(self, interaction, cadastro_view):
-        super().__init__(timeout=120)
-        self.interaction = interaction
-        self.cadastro_view = cadastro_view
-        self.confirmado = False
+        armadura = get_armor_type(classe)
 
-    @discord.ui.button(label="✅ Confirmar Cadastro", style=discord.ButtonStyle.success)
-    async def confirmar(self, interaction: discord.Interaction, button: Button):
-        if self.confirmado:
-            return await interaction.response.send_message(
-                "❌ Cadastro já foi processado.", 
-                ephemeral=True
-            )
-        self.confirmado = True
+        # Update the confirmation embed to show armor type
+        embed = discord.Embed(
+            title="📝 Confirmar Cadastro",
+            description="Verifique os dados antes de confirmar:",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Personagem", value=nick, inline=True)
+        embed.add_field(name="Classe", value=classe, inline=True)
+        embed.add_field(name="Função", value=funcao, inline=True)
+        embed.add_field(name="Armadura", value=f"{armadura}", inline=True)  # Added this line
+        embed.add_field(name="Score M+", value=f"{score:.1f}", inline=True)
+        embed.add_field(name="Raider.IO", value=f"[Link]({raiderio_url})", inline=False)
+        embed.add_field(name="Servidor", value=server, inline=True)
+
+        # O próprio embed guarda o cadastro até a confirmação (veja cadastro_pendente)
+        await interaction.followup.send(
+            embed=embed,
+            view=componentes(
+                ConfirmarCadastroButton(interaction.user.id),
+                CancelarCadastroButton(interaction.user.id)
+            ),
+            ephemeral=True
+        )
 
+def cadastro_pendente(embed: discord.Embed) -> Dict[str, str]:
+    """
+    O cadastro aguardando confirmação não fica em memória: os dados são lidos de volta
+    dos campos do embed de confirmação, que só o bot pode ter escrito
+    """
+    campos = {campo.name: campo.value for campo in embed.fields}
+    campos["Raider.IO"] = campos["Raider.IO"].removeprefix("[Link](").removesuffix(")")
+    return campos
+
+class ConfirmarCadastroButton(ItemCadastro, DynamicItem[Button], template=r"bm:cadastro:confirmar:(?P<user_id>[0-9]+)"):
+    def __init__(self, user_id: int):
+        super().__init__(Button(
+            label="✅ Confirmar Cadastro",
+            style=discord.ButtonStyle.success,
+            custom_id=f"bm:cadastro:confirmar:{user_id}"
+        ))
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(int(match["user_id"]))
+
+    @medir_interacao("botao", "ConfirmarCadastroButton")
+    async def callback(self, interaction: discord.Interaction):
         try:
+            dados = cadastro_pendente(interaction.message.embeds[0])
+
             # Primeiro desabilita os botões
-            for item in self.children:
-                item.disabled = True
-            try:
-                await interaction.message.edit(view=self)
-            except Exception:
-                pass  # Ignora erro se a mensagem não existir mais
+            await desabilitar_botoes(interaction)
 
-            # Insere no banco de dados
-            async with aiosqlite.connect("data/raiderio.db") as db:
+            # Insere no banco de dados; um segundo clique esbarra na chave única
+            async with interaction.client.db.escrita() as db:
                 await db.execute("""
                     INSERT INTO jogadores 
-                    (user_id, nome, funcao, armadura, raiderio_url, raiderio_score, 
+                    (guild_id, user_id, nome, funcao, armadura, raiderio_url, raiderio_score, 
                      personagem_nome, personagem_classe, personagem_server, disponibilidade, ultima_atualizacao)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, datetime('now'))
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
                 """, (
-                    self.cadastro_view.user_id,
-                    self.cadastro_view.nome,
-                    self.cadastro_view.funcao,
-                    self.cadastro_view.armadura,
-                    self.cadastro_view.raiderio_url,
-                    self.cadastro_view.raiderio_score,
-                    self.cadastro_view.personagem_nome,
-                    self.cadastro_view.personagem_classe,
-                    self.cadastro_view.personagem_server  # NOVO
+                    interaction.guild_id,
+                    self.user_id,
+                    interaction.user.display_name,
+                    FUNCOES.codigo(dados["Função"]),
+                    ARMADURAS.codigo(dados["Armadura"]),
+                    dados["Raider.IO"],
+                    float(dados["Score M+"]),
+                    dados["Personagem"],
+                    CLASSES.codigo(dados["Classe"]),
+                    dados["Servidor"],
+                    int(time())
                 ))
-                await db.commit()
+                await interaction.client.disponiveis.sincronizar_usuario(db, self.user_id)
 
             # Envia mensagem de sucesso
             embed = discord.Embed(
                 title="✅ Cadastro Concluído!",
                 description=(
-                    f"**Personagem:** {self.cadastro_view.personagem_nome}\n"
-                    f"**Classe:** {self.cadastro_view.personagem_classe}\n"
-                    f"**Função:** {self.cadastro_view.funcao}\n"
-                    f"**Score M+:** {int(self.cadastro_view.raiderio_score)}\n\n"
+                    f"**Personagem:** {dados['Personagem']}\n"
+                    f"**Classe:** {dados['Classe']}\n"
+                    f"**Função:** {dados['Função']}\n"
+                    f"**Score M+:** {int(float(dados['Score M+']))}\n\n"
                     "Use `/perfil` para gerenciar seu personagem."
                 ),
                 color=discord.Color.green()
@@ -431,77 +471,96 @@ class ConfirmarCadastroView(View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Limpa o cadastro ativo
-            active_cadastros.pop(interaction.user.id, None)
+            await interaction.client.estado.liberar("cadastro", interaction.user.id)
             
+        except sqlite3.IntegrityError:
+            await interaction.response.send_message(
+                "❌ Cadastro já foi processado.", 
+                ephemeral=True
+            )
         except Exception as e:
-            self.confirmado = False
             print(f"[ERRO NO CADASTRO] {e}")
             await interaction.response.send_message(
                 "❌ **Erro ao completar cadastro.** Tente novamente.",
                 ephemeral=True
             )
 
-    @discord.ui.button(label="❌ Cancelar", style=discord.ButtonStyle.danger)
-    async def cancelar(self, interaction: discord.Interaction, button: Button):
-        # Desabilita os botões
-        for item in self.children:
-            item.disabled = True
-        try:
-            await interaction.message.edit(view=self)
-        except Exception:
-            pass  # Ignora erro se a mensagem não existir mais
-        
-        await interaction.response.send_message(
-            CADASTRO_CANCELADO,
-            ephemeral=True
-        )
-        active_cadastros.pop(interaction.user.id, None)
+class GerenciarPersonagemButton(
+    ItemPrivado,
+    DynamicItem[Button],
+    template=r"bm:gerenciar:(?P<acao>disponivel|indisponivel|deletar|raiderio):(?P<user_id>[0-9]+):(?P<jogador_id>[0-9]+)"
+):
+    BOTOES = {
+        "disponivel": ("🟢Disponível", discord.ButtonStyle.success),
+        "indisponivel": ("🔴Indisponível", discord.ButtonStyle.danger),
+        "deletar": ("⚠️Deletar Cadastro⚠️", discord.ButtonStyle.secondary),
+        "raiderio": ("🔄 Atualizar Raider.IO", discord.ButtonStyle.primary),
+    }
+
+    def __init__(self, acao: str, user_id: int, jogador_id: int):
+        label, style = self.BOTOES[acao]
+        super().__init__(Button(
+            label=label,
+            style=style,
+            custom_id=f"bm:gerenciar:{acao}:{user_id}:{jogador_id}"
+        ))
+        self.acao = acao
+        self.user_id = user_id
+        self.jogador_id = jogador_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(match["acao"], int(match["user_id"]), int(match["jogador_id"]))
+
+    @classmethod
+    def view(cls, user_id: int, jogador_id: int) -> View:
+        return componentes(*(cls(acao, user_id, jogador_id) for acao in cls.BOTOES))
 
-class GerenciarPersonagemView(View):
-    def __init__(self, personagem_nome):
-        super().__init__(timeout=60)
-        self.personagem_nome = validar_entrada_usuario(personagem_nome, 50)
+    async def callback(self, interaction: discord.Interaction):
+        if self.acao == "disponivel":
+            await self.disponivel(interaction)
+        elif self.acao == "indisponivel":
+            await self.indisponivel(interaction)
+        elif self.acao == "deletar":
+            await self.deletar(interaction)
+        else:
+            await self.atualizar_raiderio(interaction)
 
     async def _check_cooldown(self, interaction, acao):
-        key = (interaction.user.id, self.personagem_nome.lower(), acao)
-        now = time()
-        last = button_cooldowns.get(key, 0)
-        if now - last < BUTTON_COOLDOWN_SECONDS:
-            restante = int(BUTTON_COOLDOWN_SECONDS - (now - last))
+        key = (self.user_id, self.jogador_id, acao)
+        restante = await interaction.client.estado.cooldown_tentar("botao", key, BUTTON_COOLDOWN_SECONDS)
+        if restante > 0:
             await interaction.response.send_message(
-                f"⏳ Aguarde {restante} segundos para usar este botão novamente.",
+                f"⏳ Aguarde {int(restante)} segundos para usar este botão novamente.",
                 ephemeral=True
             )
             return False
-        button_cooldowns[key] = now
         return True
 
-    @discord.ui.button(label="🟢Disponível", style=discord.ButtonStyle.success)
-    async def disponivel(self, interaction: discord.Interaction, button: Button):
+    @medir_interacao("botao", "GerenciarPersonagem.disponivel")
+    async def disponivel(self, interaction: discord.Interaction):
         if not await self._check_cooldown(interaction, "disponivel"):
             return
         await self._atualizar_disponibilidade(interaction, 1)
 
-    @discord.ui.button(label="🔴Indisponível", style=discord.ButtonStyle.danger)
-    async def indisponivel(self, interaction: discord.Interaction, button: Button):
+    @medir_interacao("botao", "GerenciarPersonagem.indisponivel")
+    async def indisponivel(self, interaction: discord.Interaction):
         if not await self._check_cooldown(interaction, "indisponivel"):
             return
         await self._atualizar_disponibilidade(interaction, 0)
 
     async def _atualizar_disponibilidade(self, interaction, disponibilidade):
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
+            async with interaction.client.db.escrita() as db:
                 await db.execute(
-                    "UPDATE jogadores SET disponibilidade = ? WHERE personagem_nome = ? AND user_id = ?",
-                    (disponibilidade, self.personagem_nome, str(interaction.user.id))
+                    "UPDATE jogadores SET disponibilidade = ? WHERE id = ? AND user_id = ? AND guild_id = ?",
+                    (disponibilidade, self.jogador_id, self.user_id, interaction.guild_id)
                 )
-                await db.commit()
+                await interaction.client.disponiveis.sincronizar_usuario(db, self.user_id)
                 
                 cursor = await db.execute(
-                    "SELECT nome, funcao, armadura, disponibilidade, raiderio_url, "
-                    "raiderio_score, personagem_nome, personagem_classe, ultima_atualizacao, personagem_server "
-                    "FROM jogadores WHERE personagem_nome = ? AND user_id = ?",
-                    (self.personagem_nome, str(interaction.user.id))
+                    f"SELECT {COLUNAS_PERFIL} FROM jogadores WHERE id = ? AND user_id = ? AND guild_id = ?",
+                    (self.jogador_id, self.user_id, interaction.guild_id)
                 )
                 dados = await cursor.fetchone()
                 
@@ -511,8 +570,8 @@ class GerenciarPersonagemView(View):
                     ephemeral=True
                 )
                 
-            embed = self._criar_embed_perfil(dados)
-            await interaction.response.edit_message(embed=embed, view=self, content=None)
+            embed = embed_perfil(dados)
+            await interaction.response.edit_message(embed=embed, content=None)
         except Exception as e:
             print(f"[ERRO] _atualizar_disponibilidade: {e}")
             await interaction.response.send_message(
@@ -520,30 +579,25 @@ class GerenciarPersonagemView(View):
                 ephemeral=True
             )
 
-    def _criar_embed_perfil(self, dados):
-        embed = discord.Embed(title=f"Perfil de {self.personagem_nome}", color=discord.Color.blue())
-        embed.add_field(name="Classe", value=dados[7] or "—", inline=True)
-        embed.add_field(name="Função", value=dados[1] or "—", inline=True)
-        embed.add_field(name="Servidor", value=dados[9] or "—", inline=True)  # NOVO
-        embed.add_field(name="Armadura", value=dados[2] or "—", inline=True)
-        embed.add_field(name="Disponível", value="🟢 Sim" if dados[3] else "🔴 Não", inline=True)
-        embed.add_field(name="Raider.IO", value=f"[Link]({dados[4]})" if dados[4] else "—", inline=False)
-        embed.add_field(name="Score M+", value=str(int(dados[5])) if dados[5] else "—", inline=True)
-        embed.add_field(name="Última atualização", value=dados[8] or "—", inline=True)
-        return embed
-
-    @discord.ui.button(label="⚠️Deletar Cadastro⚠️", style=discord.ButtonStyle.secondary)
-    async def deletar(self, interaction: discord.Interaction, button: Button):
+    @medir_interacao("botao", "GerenciarPersonagem.deletar")
+    async def deletar(self, interaction: discord.Interaction):
         if not await self._check_cooldown(interaction, "deletar"):
             return
             
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                await db.execute(
-                    "DELETE FROM jogadores WHERE personagem_nome = ? AND user_id = ?",
-                    (self.personagem_nome, str(interaction.user.id))
+            async with interaction.client.db.escrita() as db:
+                cursor = await db.execute(
+                    "DELETE FROM jogadores WHERE id = ? AND user_id = ? AND guild_id = ? RETURNING personagem_nome",
+                    (self.jogador_id, self.user_id, interaction.guild_id)
+                )
+                removidos = await cursor.fetchall()
+                await interaction.client.disponiveis.sincronizar_usuario(db, self.user_id)
+
+            if not removidos:
+                return await interaction.response.send_message(
+                    PERSONAGEM_NAO_ENCONTRADO,
+                    ephemeral=True
                 )
-                await db.commit()
                 
             try:
                 await interaction.message.edit(
@@ -555,7 +609,7 @@ class GerenciarPersonagemView(View):
                 pass
                 
             await interaction.response.send_message(
-                PERSONAGEM_REMOVIDO(self.personagem_nome),
+                PERSONAGEM_REMOVIDO(removidos[0][0]),
                 ephemeral=True
             )
         except Exception as e:
@@ -565,134 +619,315 @@ class GerenciarPersonagemView(View):
                 ephemeral=True
             )
 
-    @discord.ui.button(label="🔄 Atualizar Raider.IO", style=discord.ButtonStyle.primary)
-    async def atualizar_raiderio(self, interaction: discord.Interaction, button: Button):
+    @medir_interacao("botao", "GerenciarPersonagem.atualizar_raiderio")
+    async def atualizar_raiderio(self, interaction: discord.Interaction):
+        # Com a fila cheia recusa antes de tomar os cooldowns, que bloqueariam uma ação que não rodou
+        if interaction.client.trabalhos.cheio():
+            interaction.client.trabalhos.recusados += 1
+            return await interaction.response.send_message(SISTEMA_SOBRECARGADO, ephemeral=True)
         if not await self._check_cooldown(interaction, "atualizar_raiderio"):
             return
             
-        user_key = f"{interaction.user.id}:{self.personagem_nome.lower()}"
-        now = time()
-        cooldown = raiderio_cooldowns.get(user_key, 0)
+        user_key = f"{self.user_id}:{self.jogador_id}"
+        restante = await interaction.client.estado.cooldown_tentar("raiderio", user_key, RAIDERIO_COOLDOWN_SECONDS)
         
-        if now - cooldown < RAIDERIO_COOLDOWN_SECONDS:
-            restante = int(RAIDERIO_COOLDOWN_SECONDS - (now - cooldown))
+        if restante > 0:
             await interaction.response.send_message(
-                f"⏳ Aguarde {restante} segundos para atualizar novamente.",
+                f"⏳ Aguarde {int(restante)} segundos para atualizar novamente.",
                 ephemeral=True
             )
             return
 
-        raiderio_cooldowns[user_key] = now
+        # Confirma o clique na hora; a mensagem é editada quando o Raider.IO responder
+        await interaction.response.defer()
+        enfileirado = interaction.client.trabalhos.enviar(
+            "atualizar_raiderio",
+            lambda: self._atualizar_score(interaction),
+            ao_falhar=lambda: interaction.followup.send(ERRO_ATUALIZAR_RAIDERIO, ephemeral=True)
+        )
+        if not enfileirado:
+            await interaction.client.estado.liberar("raiderio", user_key)
+            await interaction.client.estado.liberar("botao", (self.user_id, self.jogador_id, "atualizar_raiderio"))
+            await interaction.followup.send(SISTEMA_SOBRECARGADO, ephemeral=True)
+
+    async def _atualizar_score(self, interaction: discord.Interaction):
+        """Consulta o Raider.IO e grava o score; roda no pool de trabalhos e responde por follow-up"""
+        row = await interaction.client.db.buscar_um(
+            "SELECT raiderio_url FROM jogadores WHERE id = ? AND user_id = ? AND guild_id = ?",
+            (self.jogador_id, self.user_id, interaction.guild_id)
+        )
+        
+        if not row or not row[0]:
+            await interaction.followup.send(
+                "❌ Link Raider.IO não encontrado para este personagem.", 
+                ephemeral=True
+            )
+            return
+            
+        url = row[0]
 
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                cursor = await db.execute(
-                    "SELECT raiderio_url FROM jogadores WHERE personagem_nome = ? AND user_id = ?",
-                    (self.personagem_nome, str(interaction.user.id))
-                )
-                row = await cursor.fetchone()
-                
-                if not row or not row[0]:
-                    await interaction.response.send_message(
-                        "❌ Link Raider.IO não encontrado para este personagem.", 
-                        ephemeral=True
-                    )
-                    return
-                    
-                url = row[0]
-
-            score_tuple = await obter_score_raiderio(url)
-            if isinstance(score_tuple, tuple):
-                score = score_tuple[0]
-            else:
-                score = score_tuple
+            # Pedido explícito de atualização: ignora o cache (o cooldown por usuário protege a API)
+            score_tuple = await interaction.client.raiderio.obter_score(url, forcar=True)
+        except RaiderIOIndisponivel:
+            await interaction.followup.send(RAIDERIO_INDISPONIVEL, ephemeral=True)
+            return
+        if isinstance(score_tuple, tuple):
+            score = score_tuple[0]
+        else:
+            score = score_tuple
+
+        if score is None:
+            await interaction.followup.send(
+                "❌ Não foi possível atualizar o score. Verifique o link Raider.IO.", 
+                ephemeral=True
+            )
+            return
 
-            if score is None:
-                await interaction.response.send_message(
-                    "❌ Não foi possível atualizar o score. Verifique o link Raider.IO.", 
-                    ephemeral=True
-                )
-                return
+        async with interaction.client.db.escrita() as db:
+            await db.execute(
+                "UPDATE jogadores SET raiderio_score = ?, ultima_atualizacao = ? WHERE id = ? AND user_id = ? AND guild_id = ?",
+                (score, int(time()), self.jogador_id, self.user_id, interaction.guild_id)
+            )
+            await interaction.client.disponiveis.sincronizar_usuario(db, self.user_id)
 
-            hoje = datetime.now().date().isoformat()
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                await db.execute(
-                    "UPDATE jogadores SET raiderio_score = ?, ultima_atualizacao = ? WHERE personagem_nome = ? AND user_id = ?",
-                    (score, hoje, self.personagem_nome, str(interaction.user.id))
-                )
-                await db.commit()
+            cursor = await db.execute(
+                f"SELECT {COLUNAS_PERFIL} FROM jogadores WHERE id = ? AND user_id = ? AND guild_id = ?",
+                (self.jogador_id, self.user_id, interaction.guild_id)
+            )
+            dados = await cursor.fetchone()
 
-                cursor = await db.execute(
-                    "SELECT nome, funcao, armadura, disponibilidade, raiderio_url, "
-                    "raiderio_score, personagem_nome, personagem_classe, ultima_atualizacao, personagem_server "
-                    "FROM jogadores WHERE personagem_nome = ? AND user_id = ?",
-                    (self.personagem_nome, str(interaction.user.id))
-                )
-                dados = await cursor.fetchone()
-                
-            embed = self._criar_embed_perfil(dados)
-            await interaction.response.edit_message(embed=embed, view=self, content=None)
-            
-        except Exception as e:
-            print(f"[ERRO] atualizar_raiderio: {e}")
-            await interaction.response.send_message(
-                ERRO_ATUALIZAR_RAIDERIO,
+        if not dados:
+            return await interaction.followup.send(
+                PERSONAGEM_NAO_ENCONTRADO,
                 ephemeral=True
             )
+            
+        embed = embed_perfil(dados)
+        await interaction.edit_original_response(embed=embed, content=None)
 
 # --- BOT CLASS COM MELHORIAS ---
 
-class Bot(commands.Bot):
+class Bot(commands.AutoShardedBot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.guilds = True
-        super().__init__(command_prefix="!", intents=intents)
-        self.db_conn = None
-        self.db_lock = asyncio.Lock()
+        super().__init__(command_prefix="!", intents=intents, shard_count=SHARD_COUNT)
+        self.db = PoolConexoes(
+            DB_PATH,
+            leitores=DB_LEITORES,
+            journal_mode=SQLITE_JOURNAL_MODE,
+            synchronous=SQLITE_SYNCHRONOUS,
+            cache_kb=SQLITE_CACHE_KB,
+            mmap_bytes=SQLITE_MMAP_MB * 1024 * 1024,
+            busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS
+        )
+        self.inicio_processo = perf_counter()
+        self.fim_setup = None
+        self.tempos_inicializacao: Dict[str, float] = {}
+        self.pronto = False
         self.cleanup_task = None
+        self.historico_task = None
+        self.atualizador = None
+        self.disponiveis = IndiceDisponiveis()
+        self.configs = ConfigGuilds()
+        self.estado = criar_estado(ESTADO_BACKEND, self.db.caminho)
+        self.trabalhos = PoolTrabalhos(TRABALHOS_WORKERS, TRABALHOS_FILA)
+        self.memoria = MonitorMemoria(self.tamanhos_estruturas)
+        self.servidor_metricas = None
+        self.raiderio = RaiderIOClient(
+            cache_ttl=RAIDERIO_CACHE_TTL,
+            cache_stale=RAIDERIO_CACHE_STALE,
+            cache_max=RAIDERIO_CACHE_MAX,
+            max_tentativas=RAIDERIO_TENTATIVAS,
+            timeout=RAIDERIO_TIMEOUT,
+            circuito=CircuitBreaker(RAIDERIO_CIRCUITO_FALHAS, RAIDERIO_CIRCUITO_SEGUNDOS)
+        )
 
-    async def setup_hook(self):
-        self.db_conn = await aiosqlite.connect("data/raiderio.db")
-        await self.db_conn.execute("""
-            CREATE TABLE IF NOT EXISTS jogadores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                nome TEXT,
-                funcao TEXT,
-                armadura TEXT,
-                disponibilidade INTEGER DEFAULT 0,
-                raiderio_url TEXT,
-                raiderio_score REAL,
-                personagem_nome TEXT, 
-                personagem_classe TEXT,
-                personagem_server TEXT,  -- NOVO CAMPO
-                ultima_atualizacao TEXT,
-                UNIQUE(user_id, personagem_nome)
-            )
-        """)
-        await self.db_conn.commit()
+    def tamanhos_estruturas(self) -> Dict[str, int]:
+        """Tamanho das estruturas em memória que crescem com o uso"""
+        return {
+            **{f"estado_{nome}": tamanho for nome, tamanho in self.estado.tamanhos().items()},
+            "cache_raiderio": len(self.raiderio.cache),
+            "indice_disponiveis": len(self.disponiveis),
+            "configs_guild": len(self.configs),
+            "fila_trabalhos": len(self.trabalhos),
+            "cache_embeds_perfil": estatisticas_embeds()["perfis"],
+            "cache_embeds_lista": estatisticas_embeds()["listas"],
+        }
+
+    def registrar_medidores(self):
+        registro_metricas.registrar(Medidor(
+            "bot_guilds", "Servidores em que o bot está", lambda: len(self.guilds)
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_shards", "Shards conectados", lambda: len(self.shards)
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_cache_raiderio_hit_ratio", "Fração de consultas ao Raider.IO servidas pelo cache",
+            lambda: self.raiderio.cache.estatisticas()["hit_ratio"]
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_cache_raiderio_itens", "Perfis no cache do Raider.IO", lambda: len(self.raiderio.cache)
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_raiderio_coalescidas", "Requisições ao Raider.IO evitadas por single-flight",
+            lambda: self.raiderio.requisicoes_coalescidas
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_raiderio_circuito_aberto", "1 enquanto o circuit breaker do Raider.IO rejeita consultas",
+            lambda: int(self.raiderio.circuito.estado != CircuitBreaker.FECHADO)
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_trabalhos_fila", "Trabalhos de interações aguardando um worker", lambda: len(self.trabalhos)
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_trabalhos_recusados", "Trabalhos recusados com a fila cheia", lambda: self.trabalhos.recusados
+        ))
+        registro_metricas.registrar(Medidor(
+            "bot_disponiveis", "Personagens disponíveis no índice em memória", lambda: len(self.disponiveis)
+        ))
+
+    @contextmanager
+    def fase(self, nome: str):
+        """Cronometra uma fase da inicialização"""
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            duracao = perf_counter() - inicio
+            self.tempos_inicializacao[nome] = duracao
+            INICIALIZACAO_SEGUNDOS.observar(duracao, fase=nome)
+
+    def relatorio_inicializacao(self) -> str:
+        fases = " | ".join(f"{nome} {duracao * 1000:.0f}ms" for nome, duracao in self.tempos_inicializacao.items())
+        return f"[STARTUP] {fases} | total {perf_counter() - self.inicio_processo:.2f}s"
+
+    def hash_arvore_comandos(self) -> str:
+        """Hash do payload que seria enviado ao Discord pelo tree.sync()"""
+        payload = sorted(
+            (comando.to_dict(self.tree) for comando in self.tree.get_commands()),
+            key=lambda comando: (comando.get("type", 1), comando["name"])
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def sincronizar_comandos(self) -> bool:
+        """
+        Sincroniza a árvore de comandos só se ela mudou desde a última sincronização desta aplicação.
+        tree.sync() tem rate limit global baixo; reinícios sem mudança nos comandos não precisam dele.
+        """
+        if SYNC_COMANDOS == "nunca":
+            return False
+        chave = f"hash_comandos:{self.application_id}"
+        atual = self.hash_arvore_comandos()
+        if SYNC_COMANDOS != "sempre":
+            linha = await self.db.buscar_um("SELECT valor FROM metadados WHERE chave = ?", (chave,))
+            if linha and linha[0] == atual:
+                return False
         await self.tree.sync()
+        await self.db.executar(
+            "INSERT INTO metadados (chave, valor) VALUES (?, ?) "
+            "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            (chave, atual)
+        )
+        return True
+
+    async def setup_hook(self):
+        if MEMORIA_TRACEMALLOC:
+            self.memoria.iniciar()
+        with self.fase("raiderio"):
+            # Sessão HTTP compartilhada com o Raider.IO (pool keep-alive + cache DNS)
+            await self.raiderio.iniciar()
+        with self.fase("banco"):
+            await self.db.abrir()
+        with self.fase("migracoes"):
+            async with self.db.escrita() as db:
+                await aplicar_migracoes(db)
+        with self.fase("indices"):
+            # Índice em memória dos personagens disponíveis e configuração dos servidores
+            async with self.db.leitura() as db:
+                await self.disponiveis.carregar(db)
+                await self.configs.carregar(db)
+            await self.estado.abrir()
+        with self.fase("comandos"):
+            # Botões persistentes: o estado vem do custom_id, então valem para mensagens antigas
+            self.add_dynamic_items(
+                IniciarCadastroButton, CancelarCadastroButton, ConfirmarCadastroButton,
+                GerenciarPersonagemButton, PersonagemButton, AtualizarPerfilButton, DisponibilidadeGeralButton
+            )
+            sincronizou = await self.sincronizar_comandos()
+        print(f"[STARTUP] Árvore de comandos {'sincronizada' if sincronizou else 'inalterada, sync ignorado'}")
         
+        with self.fase("metricas"):
+            # Métricas no formato do Prometheus
+            self.registrar_medidores()
+            if METRICAS_PORTA:
+                self.servidor_metricas = ServidorMetricas(registro_metricas, METRICAS_HOST, METRICAS_PORTA)
+                try:
+                    await self.servidor_metricas.iniciar()
+                except OSError as e:
+                    print(f"[ERRO METRICAS] Não foi possível abrir a porta {METRICAS_PORTA}: {e}")
+                    self.servidor_metricas = None
+
+        # Pool que executa a parte lenta dos modais e botões depois do defer()
+        self.trabalhos.iniciar()
+
         # Inicia task de limpeza periódica
         self.cleanup_task = asyncio.create_task(self.cleanup_periodico())
+        self.historico_task = asyncio.create_task(self.compactar_historico_periodico())
+
+        # Inicia atualização dos scores em segundo plano
+        self.atualizador = AtualizadorScores(
+            self.db,
+            self.raiderio,
+            indice=self.disponiveis,
+            requisicoes_por_minuto=ATUALIZADOR_RPM,
+            intervalo=ATUALIZADOR_INTERVALO
+        )
+        self.atualizador.iniciar()
+        self.fim_setup = perf_counter()
 
     async def cleanup_periodico(self):
         """Task que roda periodicamente para limpar memória"""
         while True:
             try:
                 await asyncio.sleep(300)  # 5 minutos
-                limpar_cooldowns_expirados()
-                gc.collect()  # Força garbage collection
-                print(f"[CLEANUP] Views ativas: {active_views_count}, Cooldowns: {len(raiderio_cooldowns)}")
+                expirados = await self.estado.expirar()
+                cache = self.raiderio.cache.estatisticas()
+                print(
+                    f"[CLEANUP] Estado expirado: {expirados}, "
+                    f"Cache Raider.IO: {cache['itens']} perfis, hits {cache['hits']}/{cache['stale_hits']} (stale), "
+                    f"misses {cache['misses']}, coalescidas {self.raiderio.requisicoes_coalescidas}"
+                )
             except Exception as e:
                 print(f"[ERRO CLEANUP] {e}")
 
+    async def compactar_historico_periodico(self):
+        """Task que reduz e expira o histórico de scores antigo"""
+        while True:
+            try:
+                async with self.db.escrita() as db:
+                    reduzidos, expirados = await compactar_historico(db)
+                if reduzidos or expirados:
+                    print(f"[HISTORICO] {reduzidos} pontos reduzidos, {expirados} expirados")
+            except Exception as e:
+                print(f"[ERRO HISTORICO] {e}")
+            await asyncio.sleep(HISTORICO_COMPACTAR_HORAS * 3600)
+
     async def close(self):
         if self.cleanup_task:
             self.cleanup_task.cancel()
-        if self.db_conn:
-            await self.db_conn.close()
+        if self.historico_task:
+            self.historico_task.cancel()
+        if self.atualizador:
+            await self.atualizador.parar()
+        await self.trabalhos.parar()
+        if self.servidor_metricas:
+            await self.servidor_metricas.parar()
+        await self.raiderio.fechar()
+        await self.estado.fechar()
+        await self.db.fechar()
         await super().close()
 
 bot = Bot()
@@ -700,29 +935,18 @@ bot = Bot()
 # --- COMANDOS ---
 
 @bot.tree.command(name="cadastrar", description="Inicia um cadastro privado")
+@app_commands.guild_only()
+@medir_interacao("comando", "cadastrar")
 async def cadastrar_slash(interaction: discord.Interaction):
-    # Verifica se há muitas views ativas
-    if active_views_count > MAX_ACTIVE_VIEWS:
-        return await interaction.response.send_message(
-            SISTEMA_SOBRECARGADO,
-            ephemeral=True
-        )
-    
-    if interaction.user.id in active_cadastros:
-        if active_cadastros[interaction.user.id] == "concluido":
-            active_cadastros.pop(interaction.user.id, None)
-            return await interaction.response.send_message(
-                CADASTRO_CONCLUIDO,
-                ephemeral=True
-            )
+    # Reserva atômica: outro processo não consegue abrir um segundo cadastro do mesmo usuário
+    if not await bot.estado.reservar("cadastro", interaction.user.id, CADASTRO_TTL_SECONDS):
         return await interaction.response.send_message(
             CADASTRO_EM_ANDAMENTO,
             ephemeral=True
         )
         
     try:
-        view = CadastroView(interaction)
-        active_cadastros[interaction.user.id] = view
+        view = componentes(IniciarCadastroButton(interaction.user.id), CancelarCadastroButton(interaction.user.id))
         await interaction.response.send_message(
             f"{interaction.user.mention}, iniciando seu cadastro privado...",
             view=view,
@@ -730,86 +954,157 @@ async def cadastrar_slash(interaction: discord.Interaction):
         )
     except Exception as e:
         print(f"[ERRO CADASTRAR] {e}")
+        await bot.estado.liberar("cadastro", interaction.user.id)
         await interaction.response.send_message(
             ERRO_INICIAR_CADASTRO,
             ephemeral=True
         )
 
-@bot.event
-async def on_ready():
-    print(f"✅ Bot online como {bot.user.name}")
-    canal = bot.get_channel(INSTRUCOES_CANAL_ID)
-    if canal:
-        try:
-            if os.path.exists(BOASVINDAS_MSG_ID_FILE):
-                with open(BOASVINDAS_MSG_ID_FILE, "r") as f:
-                    msg_id = int(f.read().strip())
-                msg = await canal.fetch_message(msg_id)
-                await msg.delete()
-        except Exception as e:
-            print(f"[Boas-vindas] Erro ao deletar mensagem antiga: {e}")
+def ler_boasvindas_msg_id_legado() -> Optional[int]:
+    """Id da mensagem de boas-vindas salvo em arquivo antes da configuração por servidor"""
+    try:
+        with open(BOASVINDAS_MSG_ID_FILE, "r") as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
 
-        embed = discord.Embed(
-            title="🎉 Bem-vindo ao Cadastro do BakersM+!",
-            description=BOAS_VINDAS,
-            color=discord.Color.gold()
+async def adotar_cadastros_sem_servidor() -> None:
+    """
+    Cadastros anteriores à coluna guild_id pertencem ao servidor original do bot:
+    o do canal INSTRUCOES_CANAL_ID ou, na falta dele, o único servidor em que o bot está.
+    Um cadastro antigo cujo personagem já foi recadastrado nesse servidor é descartado
+    (o cadastro novo prevalece), senão a chave única impediria a adoção a cada início.
+    """
+    canal = bot.get_channel(INSTRUCOES_CANAL_ID)
+    if canal is not None:
+        guild = canal.guild
+    elif len(bot.guilds) == 1:
+        guild = bot.guilds[0]
+    else:
+        orfaos = await bot.db.buscar_um("SELECT COUNT(*) FROM jogadores WHERE guild_id IS NULL")
+        if orfaos[0]:
+            print(
+                f"[GUILD] {orfaos[0]} cadastros antigos sem servidor e o canal {INSTRUCOES_CANAL_ID} não foi "
+                f"encontrado em {len(bot.guilds)} servidores; eles ficam ocultos até INSTRUCOES_CANAL_ID ser corrigido"
+            )
+        return
+    async with bot.db.escrita() as db:
+        cursor = await db.execute(
+            "UPDATE OR IGNORE jogadores SET guild_id = ? WHERE guild_id IS NULL", (guild.id,)
         )
+        adotados = cursor.rowcount
+        cursor = await db.execute("DELETE FROM jogadores WHERE guild_id IS NULL")
+        descartados = cursor.rowcount
+        if canal is not None and bot.configs.obter(guild.id).canal_instrucoes_id is None:
+            msg_id = await asyncio.to_thread(ler_boasvindas_msg_id_legado)
+            await bot.configs.definir(db, guild.id, canal_instrucoes_id=canal.id, boasvindas_msg_id=msg_id)
+        if adotados:
+            await bot.disponiveis.carregar(db)
+            print(f"[GUILD] {adotados} cadastros antigos atribuídos a {guild.name}")
+        if descartados:
+            print(f"[GUILD] {descartados} cadastros antigos descartados: o personagem já foi recadastrado em {guild.name}")
+
+async def apagar_boas_vindas(config: ConfigGuild) -> None:
+    if not config.canal_instrucoes_id or not config.boasvindas_msg_id:
+        return
+    canal = bot.get_channel(config.canal_instrucoes_id)
+    if canal is None:
+        return
+    try:
+        await canal.get_partial_message(config.boasvindas_msg_id).delete()
+    except Exception as e:
+        print(f"[Boas-vindas] Erro ao deletar mensagem antiga em {config.guild_id}: {e}")
+
+async def publicar_boas_vindas(config: ConfigGuild) -> bool:
+    """
+    Garante a mensagem de boas-vindas atual no canal de instruções do servidor.
+    Sem chamada à API se o conteúdo publicado tem o mesmo hash; se mudou, edita a mensagem
+    existente no lugar; só envia uma nova se ainda não houver (ou se ela foi apagada).
+    Retorna True se algo foi enviado/editado.
+    """
+    embed = embed_boas_vindas()
+    conteudo = hash_embed(embed)
+    if config.boasvindas_msg_id and config.boasvindas_hash == conteudo:
+        return False
+    canal = bot.get_channel(config.canal_instrucoes_id) if config.canal_instrucoes_id else None
+    if canal is None:
+        return False
+    msg = None
+    if config.boasvindas_msg_id:
+        try:
+            msg = await canal.get_partial_message(config.boasvindas_msg_id).edit(embed=embed)
+        except discord.NotFound:
+            msg = None
+    if msg is None:
         msg = await canal.send(embed=embed)
-        with open(BOASVINDAS_MSG_ID_FILE, "w") as f:
-            f.write(str(msg.id))
+    async with bot.db.escrita() as db:
+        await bot.configs.definir(db, config.guild_id, boasvindas_msg_id=msg.id, boasvindas_hash=conteudo)
+    return True
 
-class PersonagemButton(Button):
-    def __init__(self, personagem_nome):
-        self.personagem_nome = personagem_nome
-        super().__init__(
-            style=discord.ButtonStyle.primary,
-            label=personagem_nome
-        )
+@bot.event
+async def on_shard_ready(shard_id: int):
+    print(f"✅ Shard {shard_id} pronto")
 
-    async def setup(self):
+@bot.event
+async def on_ready():
+    print(f"✅ Bot online como {bot.user.name} em {len(bot.guilds)} servidor(es), {len(bot.shards)} shard(s)")
+    primeira_vez = not bot.pronto
+    bot.pronto = True
+    if primeira_vez:
+        # on_ready também dispara em reconexões; o que segue só precisa rodar uma vez
+        if bot.fim_setup is not None:
+            duracao = perf_counter() - bot.fim_setup
+            bot.tempos_inicializacao["gateway"] = duracao
+            INICIALIZACAO_SEGUNDOS.observar(duracao, fase="gateway")
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                cursor = await db.execute(
-                    "SELECT funcao FROM jogadores WHERE personagem_nome = ?",
-                    (self.personagem_nome,)
-                )
-                dados = await cursor.fetchone()
-                if dados:
-                    self.funcao = dados[0]
-                    icone = "🛡️" if self.funcao == "Tank" else \
-                            "💚" if self.funcao == "Healer" else \
-                            "⚔️" if self.funcao == "DPS" else "❔"
-                    self.label = f"{icone} {self.personagem_nome}"
+            await adotar_cadastros_sem_servidor()
         except Exception as e:
-            print(f"[ERRO SETUP_BUTTON] {e}")
+            print(f"[ERRO GUILD] {e}")
+
+    inicio = perf_counter()
+    configs = [bot.configs.obter(guild.id) for guild in bot.guilds]
+    resultados = await asyncio.gather(
+        *(publicar_boas_vindas(config) for config in configs if config.canal_instrucoes_id),
+        return_exceptions=True
+    )
+    for erro in resultados:
+        if isinstance(erro, Exception):
+            print(f"[Boas-vindas] Erro ao publicar: {erro}")
+    if primeira_vez:
+        bot.tempos_inicializacao["boas_vindas"] = perf_counter() - inicio
+        INICIALIZACAO_SEGUNDOS.observar(bot.tempos_inicializacao["boas_vindas"], fase="boas_vindas")
+        print(f"[Boas-vindas] {sum(r is True for r in resultados)} de {len(resultados)} mensagens atualizadas")
+        print(bot.relatorio_inicializacao())
+
+class PersonagemButton(ItemPrivado, DynamicItem[Button], template=r"bm:personagem:(?P<user_id>[0-9]+):(?P<jogador_id>[0-9]+)"):
+    def __init__(self, user_id: int, jogador_id: int, label: str, row=None):
+        super().__init__(
+            Button(style=discord.ButtonStyle.primary, label=label, custom_id=f"bm:personagem:{user_id}:{jogador_id}"),
+            row=row
+        )
+        self.user_id = user_id
+        self.jogador_id = jogador_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(int(match["user_id"]), int(match["jogador_id"]), item.label)
 
+    @medir_interacao("botao", "PersonagemButton")
     async def callback(self, interaction: discord.Interaction):
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
-                cursor = await db.execute(
-                    "SELECT nome, funcao, armadura, disponibilidade, raiderio_url, "
-                    "raiderio_score, personagem_nome, personagem_classe, ultima_atualizacao, personagem_server "
-                    "FROM jogadores WHERE personagem_nome = ? AND user_id = ?",
-                    (self.personagem_nome, str(interaction.user.id))
-                )
-                dados = await cursor.fetchone()
+            dados = await interaction.client.db.buscar_um(
+                f"SELECT {COLUNAS_PERFIL} FROM jogadores WHERE id = ? AND user_id = ? AND guild_id = ?",
+                (self.jogador_id, self.user_id, interaction.guild_id)
+            )
             if not dados:
                 return await interaction.response.send_message(
                     PERSONAGEM_NAO_ENCONTRADO,
                     ephemeral=True
                 )
-            embed = discord.Embed(title=f"Perfil de {self.personagem_nome}", color=discord.Color.blue())
-            embed.add_field(name="Classe", value=dados[7] or "—", inline=True)
-            embed.add_field(name="Função", value=dados[1] or "—", inline=True)
-            embed.add_field(name="Servidor", value=dados[9] or "—", inline=True)  # NOVO
-            embed.add_field(name="Armadura", value=dados[2] or "—", inline=True)
-            embed.add_field(name="Disponível", value="🟢 Sim" if dados[3] else "🔴 Não", inline=True)
-            embed.add_field(name="Raider.IO", value=f"[Link]({dados[4]})" if dados[4] else "—", inline=False)
-            embed.add_field(name="Score M+", value=str(int(dados[5])) if dados[5] else "—", inline=True)
-            embed.add_field(name="Última atualização", value=dados[8] or "—", inline=True)
+            embed = embed_perfil(dados)
             await interaction.response.send_message(
                 embed=embed,
-                view=GerenciarPersonagemView(self.personagem_nome),
+                view=GerenciarPersonagemButton.view(self.user_id, self.jogador_id),
                 ephemeral=True
             )
         except Exception as e:
@@ -819,34 +1114,15 @@ class PersonagemButton(Button):
                 ephemeral=True
             )
 
-class ListaPersonagensView(View):
-    def __init__(self, personagens, interaction):
-        super().__init__(timeout=60)
-        self.interaction = interaction
-        self.personagens = personagens
-        
-    async def setup_buttons(self):
-        """Configura os botões de forma assíncrona"""
-        # Adiciona botões de personagem
-        for nome in self.personagens[:10]:
-            button = PersonagemButton(nome)
-            await button.setup()  # Aguarda a configuração do botão
-            self.add_item(button)
-            
-        # Adiciona botões de disponibilidade geral se tiver 2+ personagens
-        if len(self.personagens) >= 2:
-            self.add_item(DisponibilidadeGeralButton(True))
-            self.add_item(DisponibilidadeGeralButton(False))
-
 @bot.tree.command(name="perfil", description="Veja seus personagens registrados")
+@app_commands.guild_only()
+@medir_interacao("comando", "perfil")
 async def perfil_slash(interaction: discord.Interaction):
     try:
-        async with bot.db_lock:
-            cursor = await bot.db_conn.execute(
-                "SELECT personagem_nome, funcao, raiderio_score, disponibilidade, personagem_server FROM jogadores WHERE user_id = ? LIMIT 10",
-                (str(interaction.user.id),)
-            )
-            personagens = await cursor.fetchall()
+        personagens = await bot.db.buscar_todos(
+            f"SELECT {COLUNAS_RESUMO} FROM jogadores WHERE user_id = ? AND guild_id = ? LIMIT 10",
+            (interaction.user.id, interaction.guild_id)
+        )
 
         if not personagens:
             return await interaction.response.send_message(
@@ -854,26 +1130,9 @@ async def perfil_slash(interaction: discord.Interaction):
                 ephemeral=True
             )
 
-        # Adiciona a contagem de personagens no topo do embed
-        embed = discord.Embed(
-            title="📋 Seus Personagens Registrados",
-            description=f"Você cadastrou {len(personagens)} de 4 personagens permitidos.",
-            color=discord.Color.gold()
-        )
-        for p in personagens:
-            status = "🟢 Disponível" if p[3] else "🔴 Indisponível"
-            func_icon = "🛡️" if p[1] == "Tank" else "💚" if p[1] == "Healer" else "⚔️"
-            embed.add_field(
-                name=f"{func_icon} {p[0]}",
-                value=f"Servidor: {p[4] or '—'}\nRaiderIO: {int(p[2])}\nStatus: {status}",
-                inline=False
-            )
+        embed = embed_lista_personagens(personagens)
 
-        nomes_personagens = [p[0] for p in personagens]
-        servidores = [p[4] for p in personagens]
-
-        view = PerfilView(nomes_personagens, servidores, interaction)
-        await view.setup_buttons()  # Configura os botões antes de enviar
+        view = view_perfil(personagens, interaction.user.id)
 
         await interaction.response.send_message(
             embed=embed,
@@ -888,78 +1147,81 @@ async def perfil_slash(interaction: discord.Interaction):
             ephemeral=True
         )
 
-class PerfilView(View):
-    def __init__(self, personagens, servidores, interaction):
-        super().__init__(timeout=60)
-        self.interaction = interaction
-        self.personagens = personagens
-        self.servidores = servidores
-
-    async def setup_buttons(self):
-        # Row 1: Disponibilidade geral e atualizar
-        if len(self.personagens) >= 2:
-            self.add_item(DisponibilidadeGeralButton(True, row=1))
-            self.add_item(DisponibilidadeGeralButton(False, row=1))
-        self.add_item(AtualizarPerfilButton(row=1))
-
-        # Row 2: Botões de personagem
-        for nome in self.personagens[:10]:
-            button = PersonagemButton(nome)
-            await button.setup()
-            button.row = 2
-            self.add_item(button)
-
-class AtualizarPerfilButton(Button):
-    def __init__(self, row=1):
+def view_perfil(personagens, user_id: int) -> View:
+    """
+    Monta os botões do /perfil a partir das linhas já carregadas (COLUNAS_RESUMO),
+    sem consultas extras ao banco
+    """
+    personagens = [ResumoPersonagem._make(p) for p in personagens]
+    itens = []
+
+    # Row 1: Disponibilidade geral e atualizar
+    if len(personagens) >= 2:
+        itens.append(DisponibilidadeGeralButton(True, user_id, row=1))
+        itens.append(DisponibilidadeGeralButton(False, user_id, row=1))
+    itens.append(AtualizarPerfilButton(user_id, row=1))
+
+    # Row 2: Botões de personagem
+    for p in personagens[:10]:
+        label = f"{icone_funcao(FUNCOES.nome(p.funcao))} {p.personagem_nome}" if p.funcao else p.personagem_nome
+        itens.append(PersonagemButton(user_id, p.id, label, row=2))
+    return componentes(*itens)
+
+class AtualizarPerfilButton(ItemPrivado, DynamicItem[Button], template=r"bm:perfil:atualizar:(?P<user_id>[0-9]+)"):
+    def __init__(self, user_id: int, row=1):
         super().__init__(
-            label="🔄 Atualizar",
-            style=discord.ButtonStyle.secondary,
+            Button(
+                label="🔄 Atualizar",
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"bm:perfil:atualizar:{user_id}"
+            ),
             row=row
         )
+        self.user_id = user_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(int(match["user_id"]))
+
+    @medir_interacao("botao", "AtualizarPerfilButton")
     async def callback(self, interaction: discord.Interaction):
         await perfil_slash.callback(interaction)
 
-class DisponibilidadeGeralButton(Button):
-    def __init__(self, disponivel: bool, row=1):
+class DisponibilidadeGeralButton(ItemPrivado, DynamicItem[Button], template=r"bm:perfil:todos:(?P<disponivel>[01]):(?P<user_id>[0-9]+)"):
+    def __init__(self, disponivel: bool, user_id: int, row=1):
         super().__init__(
-            label="🟢 Todos Disponíveis" if disponivel else "🔴 Todos Indisponíveis",
-            style=discord.ButtonStyle.success if disponivel else discord.ButtonStyle.danger,
+            Button(
+                label="🟢 Todos Disponíveis" if disponivel else "🔴 Todos Indisponíveis",
+                style=discord.ButtonStyle.success if disponivel else discord.ButtonStyle.danger,
+                custom_id=f"bm:perfil:todos:{int(disponivel)}:{user_id}"
+            ),
             row=row
         )
         self.disponivel = disponivel
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(match["disponivel"] == "1", int(match["user_id"]))
 
+    @medir_interacao("botao", "DisponibilidadeGeralButton")
     async def callback(self, interaction: discord.Interaction):
         try:
-            async with aiosqlite.connect("data/raiderio.db") as db:
+            async with interaction.client.db.escrita() as db:
                 await db.execute(
-                    "UPDATE jogadores SET disponibilidade = ? WHERE user_id = ?",
-                    (1 if self.disponivel else 0, str(interaction.user.id))
+                    "UPDATE jogadores SET disponibilidade = ? WHERE user_id = ? AND guild_id = ?",
+                    (1 if self.disponivel else 0, self.user_id, interaction.guild_id)
                 )
-                await db.commit()
+                await interaction.client.disponiveis.sincronizar_usuario(db, self.user_id)
                 cursor = await db.execute(
-                    "SELECT personagem_nome, funcao, raiderio_score, disponibilidade, personagem_server FROM jogadores WHERE user_id = ? LIMIT 10",
-                    (str(interaction.user.id),)
+                    f"SELECT {COLUNAS_RESUMO} FROM jogadores WHERE user_id = ? AND guild_id = ? LIMIT 10",
+                    (self.user_id, interaction.guild_id)
                 )
                 personagens = await cursor.fetchall()
 
-            embed = discord.Embed(
-                title="📋 Seus Personagens Registrados",
-                color=discord.Color.green() if self.disponivel else discord.Color.red()
-            )
-            for p in personagens:
-                status = "🟢 Disponível" if p[3] else "🔴 Indisponível"
-                func_icon = "🛡️" if p[1] == "Tank" else "💚" if p[1] == "Healer" else "⚔️"
-                embed.add_field(
-                    name=f"{func_icon} {p[0]}",
-                    value=f"Servidor: {p[4] or '—'}\nScore Raider.IO: {int(p[2])}\nStatus: {status}",
-                    inline=False
-                )
+            embed = embed_lista_personagens(personagens, disponivel=self.disponivel)
 
-            nomes_personagens = [p[0] for p in personagens]
-            servidores = [p[4] for p in personagens]
-            view = PerfilView(nomes_personagens, servidores, interaction)
-            await view.setup_buttons()
+            view = view_perfil(personagens, self.user_id)
 
             await interaction.response.edit_message(
                 embed=embed,
@@ -973,6 +1235,329 @@ class DisponibilidadeGeralButton(Button):
                 ephemeral=True
             )
 
+@bot.tree.command(name="grupos", description="Monta grupos de M+ com os jogadores disponíveis")
+@app_commands.guild_only()
+@app_commands.describe(
+    score_minimo="Score mínimo do Raider.IO para entrar nos grupos",
+    diversidade="Evita repetir armadura/classe no mesmo grupo"
+)
+@medir_interacao("comando", "grupos")
+async def grupos_slash(interaction: discord.Interaction, score_minimo: int = 0, diversidade: bool = True):
+    try:
+        disponiveis = bot.disponiveis.buscar(interaction.guild_id, score_minimo=score_minimo)
+        resultado = formar_grupos(disponiveis, diversidade=diversidade)
+        if not resultado.grupos:
+            return await interaction.response.send_message(SEM_GRUPOS, ephemeral=True)
+
+        embed = discord.Embed(
+            title="⚔️ Grupos de Mythic+",
+            description=f"{len(resultado.grupos)} grupo(s) formados com {len(disponiveis)} personagens disponíveis.",
+            color=discord.Color.purple()
+        )
+        for n, grupo in enumerate(resultado.grupos[:MAX_GRUPOS_EMBED], start=1):
+            linhas = [
+                f"{icone_funcao(m.funcao)} <@{m.user_id}> {m.personagem_nome} "
+                f"({m.personagem_classe or '—'}) — {int(m.raiderio_score or 0)}"
+                for m in grupo.membros
+            ]
+            embed.add_field(
+                name=f"Grupo {n} — média {int(grupo.media)}",
+                value="\n".join(linhas),
+                inline=False
+            )
+        rodape = f"{len(resultado.reservas)} personagem(ns) na reserva"
+        if len(resultado.grupos) > MAX_GRUPOS_EMBED:
+            rodape += f" • exibindo {MAX_GRUPOS_EMBED} de {len(resultado.grupos)} grupos"
+        embed.set_footer(text=rodape)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        print(f"[ERRO GRUPOS] {e}")
+        await interaction.response.send_message(ERRO_FORMAR_GRUPOS, ephemeral=True)
+
+@bot.tree.command(name="historico", description="Mostra a evolução do score de um personagem")
+@app_commands.guild_only()
+@app_commands.describe(
+    personagem="Nome do personagem",
+    dias="Período em dias (padrão: 30)"
+)
+@medir_interacao("comando", "historico")
+async def historico_slash(
+    interaction: discord.Interaction,
+    personagem: str,
+    dias: app_commands.Range[int, 1, 365] = 30
+):
+    try:
+        async with bot.db.leitura() as db:
+            cursor = await db.execute(
+                "SELECT id, personagem_nome, personagem_classe, raiderio_score FROM jogadores "
+                "WHERE guild_id = ? AND LOWER(personagem_nome) = LOWER(?)",
+                (interaction.guild_id, personagem)
+            )
+            jogador = await cursor.fetchone()
+            if not jogador:
+                return await interaction.response.send_message(PERSONAGEM_NAO_ENCONTRADO, ephemeral=True)
+            agora = int(time())
+            pontos = await buscar_historico(db, jogador[0], agora - dias * SEGUNDOS_DIA, agora)
+
+        if not pontos:
+            return await interaction.response.send_message(SEM_HISTORICO, ephemeral=True)
+
+        scores = [score for _, score in pontos]
+        variacao = scores[-1] - scores[0]
+        embed = discord.Embed(
+            title=f"📈 {jogador[1]} — últimos {dias} dias",
+            description=f"`{sparkline(scores)}`",
+            color=discord.Color.green() if variacao >= 0 else discord.Color.red()
+        )
+        embed.add_field(name="Score atual", value=f"{scores[-1]:.1f}", inline=True)
+        embed.add_field(name="Variação", value=f"{variacao:+.1f}", inline=True)
+        embed.add_field(name="Máx/Mín", value=f"{max(scores):.1f} / {min(scores):.1f}", inline=True)
+        mudancas = [
+            f"<t:{momento}:d> {score:.1f}" for momento, score in pontos[-5:]
+        ]
+        embed.add_field(name="Últimas mudanças", value="\n".join(reversed(mudancas)), inline=False)
+        if jogador[2]:
+            embed.set_footer(text=CLASSES.nome(jogador[2]))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        print(f"[ERRO HISTORICO] {e}")
+        await interaction.response.send_message(ERRO_HISTORICO, ephemeral=True)
+
+class DisponiveisView(View):
+    """Lista paginada de disponíveis; cada página é uma consulta por chave (score, id)"""
+    def __init__(self, interaction: discord.Interaction, funcao=None, armadura=None, score_minimo=0):
+        super().__init__(timeout=180)
+        self.autor_id = interaction.user.id
+        self.guild_id = interaction.guild_id
+        self.funcao = funcao
+        self.armadura = armadura
+        self.score_minimo = score_minimo
+        self.pagina = 1
+        self.linhas = []
+        self.tem_anterior = False
+        self.tem_proxima = False
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.autor_id:
+            await interaction.response.send_message(SEM_PERMISSAO_VIEW, ephemeral=True)
+            return False
+        return True
+
+    async def carregar(self, apos=None, antes=None):
+        async with bot.db.leitura() as db:
+            linhas, existe_mais = await buscar_pagina_disponiveis(
+                db,
+                self.guild_id,
+                funcao=self.funcao,
+                armadura=self.armadura,
+                score_minimo=self.score_minimo,
+                apos=apos,
+                antes=antes,
+                limite=DISPONIVEIS_POR_PAGINA
+            )
+        if antes is not None and not linhas:
+            # A lista mudou desde a última página; volta para o início
+            self.pagina = 1
+            return await self.carregar()
+        if antes is not None:
+            self.pagina -= 1
+            self.tem_anterior = existe_mais
+            self.tem_proxima = True
+        else:
+            if apos is not None:
+                self.pagina += 1
+            self.tem_anterior = apos is not None
+            self.tem_proxima = existe_mais
+        self.linhas = linhas
+        self.anterior.disabled = not self.tem_anterior
+        self.proxima.disabled = not self.tem_proxima
+
+    def criar_embed(self) -> discord.Embed:
+        filtros = [f for f in (self.funcao, self.armadura) if f]
+        if self.score_minimo:
+            filtros.append(f"score ≥ {self.score_minimo}")
+        embed = discord.Embed(
+            title="📋 Jogadores Disponíveis",
+            description="\n".join(
+                f"{icone_funcao(j.funcao)} **{j.personagem_nome}** ({j.personagem_classe or '—'}, {j.armadura or '—'}) "
+                f"— {int(j.raiderio_score or 0)} • <@{j.user_id}>"
+                for j in self.linhas
+            ),
+            color=discord.Color.green()
+        )
+        embed.set_footer(text=f"Página {self.pagina}" + (f" • {', '.join(filtros)}" if filtros else ""))
+        return embed
+
+    @discord.ui.button(label="◀️ Anterior", style=discord.ButtonStyle.secondary, disabled=True)
+    @medir_interacao("botao", "DisponiveisView.anterior")
+    async def anterior(self, interaction: discord.Interaction, button: Button):
+        try:
+            primeiro = self.linhas[0]
+            await self.carregar(antes=(primeiro.raiderio_score, primeiro.id))
+            await interaction.response.edit_message(embed=self.criar_embed(), view=self)
+        except Exception as e:
+            print(f"[ERRO DISPONIVEIS] {e}")
+            await interaction.response.send_message(ERRO_LISTAR_DISPONIVEIS, ephemeral=True)
+
+    @discord.ui.button(label="Próxima ▶️", style=discord.ButtonStyle.secondary, disabled=True)
+    @medir_interacao("botao", "DisponiveisView.proxima")
+    async def proxima(self, interaction: discord.Interaction, button: Button):
+        try:
+            ultimo = self.linhas[-1]
+            await self.carregar(apos=(ultimo.raiderio_score, ultimo.id))
+            await interaction.response.edit_message(embed=self.criar_embed(), view=self)
+        except Exception as e:
+            print(f"[ERRO DISPONIVEIS] {e}")
+            await interaction.response.send_message(ERRO_LISTAR_DISPONIVEIS, ephemeral=True)
+
+@bot.tree.command(name="disponiveis", description="Lista os jogadores disponíveis")
+@app_commands.guild_only()
+@app_commands.describe(
+    funcao="Filtrar por função",
+    armadura="Filtrar por tipo de armadura",
+    score_minimo="Score mínimo do Raider.IO"
+)
+@app_commands.choices(
+    funcao=[app_commands.Choice(name=f, value=f) for f in FUNCOES],
+    armadura=[app_commands.Choice(name=a, value=a) for a in ARMADURAS]
+)
+@medir_interacao("comando", "disponiveis")
+async def disponiveis_slash(
+    interaction: discord.Interaction,
+    funcao: Optional[app_commands.Choice[str]] = None,
+    armadura: Optional[app_commands.Choice[str]] = None,
+    score_minimo: int = 0
+):
+    try:
+        view = DisponiveisView(
+            interaction,
+            funcao=funcao.value if funcao else None,
+            armadura=armadura.value if armadura else None,
+            score_minimo=score_minimo
+        )
+        await view.carregar()
+        if not view.linhas:
+            return await interaction.response.send_message(SEM_DISPONIVEIS, ephemeral=True)
+        await interaction.response.send_message(embed=view.criar_embed(), view=view, ephemeral=True)
+    except Exception as e:
+        print(f"[ERRO DISPONIVEIS] {e}")
+        await interaction.response.send_message(ERRO_LISTAR_DISPONIVEIS, ephemeral=True)
+
+@bot.tree.command(name="configurar", description="Configura o bot neste servidor")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.describe(canal_instrucoes="Canal onde a mensagem de boas-vindas e instruções é publicada")
+@medir_interacao("comando", "configurar")
+async def configurar_slash(interaction: discord.Interaction, canal_instrucoes: discord.TextChannel):
+    try:
+        anterior = bot.configs.obter(interaction.guild_id)
+        await apagar_boas_vindas(anterior)
+        async with bot.db.escrita() as db:
+            config = await bot.configs.definir(
+                db, interaction.guild_id, canal_instrucoes_id=canal_instrucoes.id,
+                boasvindas_msg_id=None, boasvindas_hash=None
+            )
+        await interaction.response.send_message(CONFIGURACAO_SALVA(canal_instrucoes.mention), ephemeral=True)
+        await publicar_boas_vindas(config)
+    except Exception as e:
+        print(f"[ERRO CONFIGURAR] {e}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message(ERRO_CONFIGURAR, ephemeral=True)
+
+FORMATOS_ROSTER = [app_commands.Choice(name="CSV", value="csv"), app_commands.Choice(name="JSONL", value="jsonl")]
+
+@bot.tree.command(name="exportar", description="Exporta o roster deste servidor em CSV ou JSONL (apenas dono)")
+@app_commands.guild_only()
+@app_commands.describe(formato="Formato do arquivo")
+@app_commands.choices(formato=FORMATOS_ROSTER)
+@medir_interacao("comando", "exportar")
+async def exportar_slash(interaction: discord.Interaction, formato: str = "csv"):
+    if not await bot.is_owner(interaction.user):
+        return await interaction.response.send_message(SEM_PERMISSAO_COMANDO, ephemeral=True)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    existe = await bot.db.buscar_um("SELECT EXISTS(SELECT 1 FROM jogadores WHERE guild_id = ?)", (interaction.guild_id,))
+    if not existe[0]:
+        return await interaction.followup.send(ROSTER_VAZIO, ephemeral=True)
+    diretorio = await asyncio.to_thread(tempfile.mkdtemp, prefix="roster_")
+    try:
+        # Lido do banco em lotes e dividido em partes no limite de anexo do servidor
+        limite = interaction.guild.filesize_limit if interaction.guild else ROSTER_LIMITE_ANEXO
+        async with bot.db.leitura() as db:
+            arquivos, _ = await gravar_exportacao(
+                exportar_roster(db, formato, interaction.guild_id),
+                formato,
+                os.path.join(diretorio, f"roster-{interaction.guild_id}.{formato}"),
+                limite_bytes=limite
+            )
+        for numero, caminho in enumerate(arquivos, start=1):
+            await interaction.followup.send(
+                ROSTER_EXPORTADO(len(arquivos)) if numero == 1 else None,
+                file=discord.File(caminho),
+                ephemeral=True
+            )
+    except Exception as e:
+        print(f"[ERRO EXPORTAR] {e}")
+        await interaction.followup.send(ERRO_EXPORTAR, ephemeral=True)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, diretorio, True)
+
+@bot.tree.command(name="importar", description="Importa um roster CSV/JSONL para este servidor (apenas dono)")
+@app_commands.guild_only()
+@app_commands.describe(
+    arquivo="Arquivo .csv ou .jsonl no formato do /exportar",
+    manter_existentes="Não altera personagens que já existem (padrão: atualiza)"
+)
+@medir_interacao("comando", "importar")
+async def importar_slash(interaction: discord.Interaction, arquivo: discord.Attachment, manter_existentes: bool = False):
+    if not await bot.is_owner(interaction.user):
+        return await interaction.response.send_message(SEM_PERMISSAO_COMANDO, ephemeral=True)
+    try:
+        formato = formato_do_arquivo(arquivo.filename)
+    except ValueError:
+        return await interaction.response.send_message(ROSTER_FORMATO_INVALIDO, ephemeral=True)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        dados = await arquivo.read()
+        texto = io.TextIOWrapper(io.BytesIO(dados), encoding="utf-8-sig", newline="")
+        # Uma transação para o arquivo inteiro; todas as linhas vão para este servidor
+        async with bot.db.escrita() as db:
+            resultado = await importar_roster(
+                db, ler_roster(texto, formato), interaction.guild_id, substituir=not manter_existentes
+            )
+            await bot.disponiveis.carregar(db)
+        print(f"[ROSTER] Importação em {interaction.guild_id}: {resultado.gravados} gravados, {resultado.invalidos} inválidos")
+        await interaction.followup.send(ROSTER_IMPORTADO(resumo_importacao(resultado)), ephemeral=True)
+    except Exception as e:
+        print(f"[ERRO IMPORTAR] {e}")
+        await interaction.followup.send(ERRO_IMPORTAR, ephemeral=True)
+
+@bot.tree.command(name="memoria", description="Diagnóstico de memória do bot (apenas dono)")
+@app_commands.guild_only()
+@app_commands.describe(acao="relatorio: mostra o uso atual; iniciar/parar: liga ou desliga o tracemalloc")
+@app_commands.choices(acao=[
+    app_commands.Choice(name="relatorio", value="relatorio"),
+    app_commands.Choice(name="iniciar", value="iniciar"),
+    app_commands.Choice(name="parar", value="parar"),
+])
+@medir_interacao("comando", "memoria")
+async def memoria_slash(interaction: discord.Interaction, acao: str = "relatorio"):
+    if not await bot.is_owner(interaction.user):
+        return await interaction.response.send_message(SEM_PERMISSAO_COMANDO, ephemeral=True)
+    try:
+        if acao == "iniciar":
+            bot.memoria.iniciar()
+            texto = "tracemalloc ligado; o próximo relatório mostra o crescimento desde agora."
+        elif acao == "parar":
+            bot.memoria.parar()
+            texto = "tracemalloc desligado."
+        else:
+            texto = bot.memoria.relatorio(View)
+        await interaction.response.send_message(f"```\n{texto[:1900]}\n```", ephemeral=True)
+    except Exception as e:
+        print(f"[ERRO MEMORIA] {e}")
+        await interaction.response.send_message(ERRO_GERAL, ephemeral=True)
+
 if __name__ == "__main__":
     # Carrega o token do .env
     TOKEN = os.getenv("DISCORD_TOKEN")
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable, Optional, Tuple
+
+
+class CacheTTL:
+    """
+    Cache em memória limitado, com expiração (TTL) e despejo LRU.
+
+    Cada entrada passa por três estados:
+    - fresca: idade < ttl, servida diretamente
+    - velha (stale): ttl <= idade < ttl + janela_stale, servida mas deve ser revalidada
+    - expirada: removida e tratada como miss
+    """
+    def __init__(self, ttl: float, janela_stale: float = 0, max_itens: int = 1024):
+        self.ttl = ttl
+        self.janela_stale = janela_stale
+        self.max_itens = max_itens
+        self._dados: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def obter(self, chave: Hashable) -> Optional[Tuple[Any, bool]]:
+        """Retorna (valor, fresco) ou None se não houver entrada utilizável"""
+        entrada = self._dados.get(chave)
+        if entrada is None:
+            self.misses += 1
+            return None
+
+        valor, armazenado_em = entrada
+        idade = monotonic() - armazenado_em
+        if idade >= self.ttl + self.janela_stale:
+            del self._dados[chave]
+            self.misses += 1
+            return None
+
+        self._dados.move_to_end(chave)
+        if idade < self.ttl:
+            self.hits += 1
+            return valor, True
+
+        self.stale_hits += 1
+        return valor, False
+
+    def definir(self, chave: Hashable, valor: Any) -> None:
+        self._dados[chave] = (valor, monotonic())
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_itens:
+            self._dados.popitem(last=False)
+
+    def remover(self, chave: Hashable) -> None:
+        self._dados.pop(chave, None)
+
+    def limpar(self) -> None:
+        self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "itens": len(self._dados),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.stale_hits) / total if total else 0.0,
+        }
@@ -0,0 +1,34 @@
+from typing import Dict, Iterator, Optional
+
+
+class TabelaCodigos:
+    """
+    Nomes gravados como inteiros pequenos na tabela jogadores (função, armadura e classe).
+    O código é a posição do nome a partir de 1; nomes só podem ser acrescentados no fim,
+    nunca reordenados, porque os códigos já estão gravados no banco.
+    """
+    def __init__(self, *nomes: str):
+        self._codigos: Dict[str, int] = {nome: codigo for codigo, nome in enumerate(nomes, start=1)}
+        self._nomes: Dict[int, str] = {codigo: nome for nome, codigo in self._codigos.items()}
+
+    def __contains__(self, nome) -> bool:
+        return nome in self._codigos
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._codigos)
+
+    def codigo(self, nome: Optional[str]) -> Optional[int]:
+        """Código do nome; None para nomes desconhecidos (ex.: armadura "Unknown")"""
+        return self._codigos.get(nome)
+
+    def nome(self, codigo: Optional[int]) -> Optional[str]:
+        return self._nomes.get(codigo)
+
+
+# A migração 8 converte os textos antigos com estes mesmos códigos
+FUNCOES = TabelaCodigos("Tank", "Healer", "DPS")
+ARMADURAS = TabelaCodigos("Cloth", "Leather", "Mail", "Plate")
+CLASSES = TabelaCodigos(
+    "Death Knight", "Demon Hunter", "Druid", "Evoker", "Hunter", "Mage", "Monk",
+    "Paladin", "Priest", "Rogue", "Shaman", "Warlock", "Warrior"
+)
@@ -0,0 +1,52 @@
+import aiosqlite
+from typing import Dict, Iterator, NamedTuple, Optional
+
+
+class ConfigGuild(NamedTuple):
+    guild_id: int
+    canal_instrucoes_id: Optional[int] = None
+    boasvindas_msg_id: Optional[int] = None
+    boasvindas_hash: Optional[str] = None
+
+
+class ConfigGuilds:
+    """
+    Configuração por servidor (tabela config_guild).
+    Lida uma vez na inicialização e mantida em memória; cada alteração grava no banco e
+    atualiza a cópia local, então consultas não tocam o SQLite.
+    """
+    def __init__(self):
+        self._configs: Dict[int, ConfigGuild] = {}
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def __iter__(self) -> Iterator[ConfigGuild]:
+        return iter(list(self._configs.values()))
+
+    async def carregar(self, db_conn: aiosqlite.Connection) -> None:
+        cursor = await db_conn.execute(
+            "SELECT guild_id, canal_instrucoes_id, boasvindas_msg_id, boasvindas_hash FROM config_guild"
+        )
+        self._configs = {linha[0]: ConfigGuild(*linha) for linha in await cursor.fetchall()}
+
+    def obter(self, guild_id) -> ConfigGuild:
+        guild_id = int(guild_id)
+        return self._configs.get(guild_id) or ConfigGuild(guild_id)
+
+    async def definir(self, db_conn: aiosqlite.Connection, guild_id, **campos) -> ConfigGuild:
+        """Altera campos da configuração do servidor (chame dentro de uma transação de escrita)"""
+        config = self.obter(guild_id)._replace(**campos)
+        await db_conn.execute(
+            """
+            INSERT INTO config_guild (guild_id, canal_instrucoes_id, boasvindas_msg_id, boasvindas_hash)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET
+                canal_instrucoes_id = excluded.canal_instrucoes_id,
+                boasvindas_msg_id = excluded.boasvindas_msg_id,
+                boasvindas_hash = excluded.boasvindas_hash
+            """,
+            config
+        )
+        self._configs[config.guild_id] = config
+        return config
@@ -0,0 +1,198 @@
+import aiosqlite
+from bisect import bisect_right, insort
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from codigos import ARMADURAS, CLASSES, FUNCOES
+
+COLUNAS = (
+    "id, user_id, nome, funcao, armadura, personagem_classe, "
+    "raiderio_score, personagem_nome, personagem_server, guild_id"
+)
+
+
+class JogadorDisponivel(NamedTuple):
+    id: int
+    user_id: int
+    nome: str
+    funcao: Optional[str]
+    armadura: Optional[str]
+    personagem_classe: Optional[str]
+    raiderio_score: float
+    personagem_nome: str
+    personagem_server: str
+    guild_id: Optional[int]
+
+
+def _jogador(linha: tuple) -> JogadorDisponivel:
+    """Linha com COLUNAS -> JogadorDisponivel, com os códigos de função/armadura/classe já traduzidos"""
+    jogador_id, user_id, nome, funcao, armadura, classe, *resto = linha
+    return JogadorDisponivel(
+        jogador_id, user_id, nome, FUNCOES.nome(funcao), ARMADURAS.nome(armadura), CLASSES.nome(classe), *resto
+    )
+
+
+def _chave_ordem(jogador: JogadorDisponivel) -> Tuple[float, int]:
+    # Score decrescente; id desempata para a ordem ser estável
+    return -(jogador.raiderio_score or 0), jogador.id
+
+
+class IndiceDisponiveis:
+    """
+    Índice em memória dos personagens com disponibilidade = 1.
+    Separado por servidor e, dentro dele, em baldes por (função, armadura), cada um ordenado
+    por score decrescente, e mantido incrementalmente a cada escrita no banco.
+    """
+    def __init__(self):
+        self._jogadores: Dict[int, JogadorDisponivel] = {}
+        # guild_id -> (função, armadura) -> [(-score, id)] ordenado
+        self._baldes: Dict[int, Dict[Tuple[str, str], List[Tuple[float, int]]]] = {}
+        self._por_usuario: Dict[int, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._jogadores)
+
+    async def carregar(self, db_conn: aiosqlite.Connection) -> None:
+        """Reconstrói o índice inteiro a partir do banco"""
+        cursor = await db_conn.execute(
+            f"SELECT {COLUNAS} FROM jogadores WHERE disponibilidade = 1"
+        )
+        self._jogadores.clear()
+        self._baldes.clear()
+        self._por_usuario.clear()
+        for linha in await cursor.fetchall():
+            self._inserir(_jogador(linha))
+
+    async def sincronizar_usuario(self, db_conn: aiosqlite.Connection, user_id: int) -> None:
+        """
+        Relê os personagens de um usuário e atualiza o índice.
+        Chamado após cadastro, remoção ou troca de disponibilidade, dentro da mesma transação
+        de escrita (cada usuário tem no máximo alguns personagens).
+        """
+        cursor = await db_conn.execute(
+            f"SELECT {COLUNAS} FROM jogadores WHERE user_id = ? AND disponibilidade = 1",
+            (user_id,)
+        )
+        linhas = await cursor.fetchall()
+        for jogador_id in list(self._por_usuario.get(user_id, ())):
+            self.remover(jogador_id)
+        for linha in linhas:
+            self._inserir(_jogador(linha))
+
+    def atualizar_score(self, jogador_id: int, score: float) -> None:
+        """Reposiciona um personagem disponível após mudança de score"""
+        jogador = self._jogadores.get(jogador_id)
+        if jogador is None or jogador.raiderio_score == score:
+            return
+        self.remover(jogador_id)
+        self._inserir(jogador._replace(raiderio_score=score))
+
+    def remover(self, jogador_id: int) -> None:
+        jogador = self._jogadores.pop(jogador_id, None)
+        if jogador is None:
+            return
+        baldes = self._baldes.get(jogador.guild_id, {})
+        balde = baldes.get((jogador.funcao, jogador.armadura))
+        if balde is not None:
+            chave = _chave_ordem(jogador)
+            pos = bisect_right(balde, chave) - 1
+            if pos >= 0 and balde[pos] == chave:
+                del balde[pos]
+            if not balde:
+                del baldes[(jogador.funcao, jogador.armadura)]
+                if not baldes:
+                    del self._baldes[jogador.guild_id]
+        ids = self._por_usuario.get(jogador.user_id)
+        if ids is not None:
+            ids.discard(jogador_id)
+            if not ids:
+                del self._por_usuario[jogador.user_id]
+
+    def _inserir(self, jogador: JogadorDisponivel) -> None:
+        if jogador.id in self._jogadores:
+            self.remover(jogador.id)
+        self._jogadores[jogador.id] = jogador
+        baldes = self._baldes.setdefault(jogador.guild_id, {})
+        insort(baldes.setdefault((jogador.funcao, jogador.armadura), []), _chave_ordem(jogador))
+        self._por_usuario.setdefault(jogador.user_id, set()).add(jogador.id)
+
+    def buscar(
+        self,
+        guild_id: int,
+        funcao: Optional[str] = None,
+        armadura: Optional[str] = None,
+        score_minimo: float = 0,
+        limite: Optional[int] = None
+    ) -> List[JogadorDisponivel]:
+        """
+        Disponíveis do servidor filtrados por função/armadura com score >= score_minimo,
+        do maior score para o menor
+        """
+        corte = (-score_minimo, float("inf"))
+        fontes: List[Iterable[Tuple[float, int]]] = []
+        for (balde_funcao, balde_armadura), balde in self._baldes.get(guild_id, {}).items():
+            if funcao is not None and balde_funcao != funcao:
+                continue
+            if armadura is not None and balde_armadura != armadura:
+                continue
+            fim = bisect_right(balde, corte)
+            fontes.append(islice(balde, fim))
+
+        resultado = []
+        for _, jogador_id in merge(*fontes):
+            resultado.append(self._jogadores[jogador_id])
+            if limite is not None and len(resultado) >= limite:
+                break
+        return resultado
+
+    def contagem_por_funcao(self, guild_id: int) -> Dict[str, int]:
+        contagem: Dict[str, int] = {}
+        for (funcao, _), balde in self._baldes.get(guild_id, {}).items():
+            contagem[funcao] = contagem.get(funcao, 0) + len(balde)
+        return contagem
+
+
+async def buscar_pagina_disponiveis(
+    db_conn: aiosqlite.Connection,
+    guild_id: int,
+    funcao: Optional[str] = None,
+    armadura: Optional[str] = None,
+    score_minimo: float = 0,
+    apos: Optional[Tuple[float, int]] = None,
+    antes: Optional[Tuple[float, int]] = None,
+    limite: int = 10
+) -> Tuple[List[JogadorDisponivel], bool]:
+    """
+    Página de disponíveis do servidor ordenada por (score, id) decrescente, com paginação por chave (keyset).
+    `apos` é a chave do último item da página atual (próxima página); `antes` é a chave do
+    primeiro item (página anterior). Retorna (linhas, existe_mais_na_direcao_pedida).
+    """
+    condicoes = ["disponibilidade = 1", "guild_id = ?", "raiderio_score >= ?"]
+    params: list = [guild_id, score_minimo]
+    if funcao is not None:
+        condicoes.append("funcao = ?")
+        params.append(FUNCOES.codigo(funcao))
+    if armadura is not None:
+        condicoes.append("armadura = ?")
+        params.append(ARMADURAS.codigo(armadura))
+
+    if antes is not None:
+        condicoes.append("(raiderio_score > ? OR (raiderio_score = ? AND id > ?))")
+        params.extend([antes[0], antes[0], antes[1]])
+        ordem = "raiderio_score ASC, id ASC"
+    else:
+        if apos is not None:
+            condicoes.append("(raiderio_score < ? OR (raiderio_score = ? AND id < ?))")
+            params.extend([apos[0], apos[0], apos[1]])
+        ordem = "raiderio_score DESC, id DESC"
+
+    cursor = await db_conn.execute(
+        f"SELECT {COLUNAS} FROM jogadores WHERE {' AND '.join(condicoes)} ORDER BY {ordem} LIMIT ?",
+        (*params, limite + 1)
+    )
+    linhas = [_jogador(linha) for linha in await cursor.fetchall()]
+    existe_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    if antes is not None:
+        linhas.reverse()
+    return linhas, existe_mais
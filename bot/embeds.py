@@ -0,0 +1,122 @@
+import discord
+import hashlib
+import json
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence, Tuple
+from codigos import ARMADURAS, CLASSES, FUNCOES
+from mensagens import BOAS_VINDAS
+
+# Colunas na ordem dos campos dos registros abaixo; use nas consultas que alimentam os embeds.
+# Função, armadura e classe chegam como códigos (codigos.py) e ultima_atualizacao em epoch.
+COLUNAS_PERFIL = (
+    "nome, funcao, armadura, disponibilidade, raiderio_url, raiderio_score, "
+    "personagem_nome, personagem_classe, ultima_atualizacao, personagem_server"
+)
+COLUNAS_RESUMO = "personagem_nome, funcao, raiderio_score, disponibilidade, personagem_server, id"
+
+CACHE_PERFIS = 1024  # Embeds de perfil mantidos prontos
+CACHE_LISTAS = 512  # Embeds de lista de personagens mantidos prontos
+
+
+class PerfilPersonagem(NamedTuple):
+    nome: str
+    funcao: Optional[int]
+    armadura: Optional[int]
+    disponibilidade: int
+    raiderio_url: Optional[str]
+    raiderio_score: Optional[float]
+    personagem_nome: str
+    personagem_classe: Optional[int]
+    ultima_atualizacao: Optional[int]
+    personagem_server: Optional[str]
+
+
+class ResumoPersonagem(NamedTuple):
+    personagem_nome: str
+    funcao: Optional[int]
+    raiderio_score: Optional[float]
+    disponibilidade: int
+    personagem_server: Optional[str]
+    id: int
+
+
+def icone_funcao(funcao: Optional[str]) -> str:
+    return "🛡️" if funcao == "Tank" else \
+           "💚" if funcao == "Healer" else \
+           "⚔️" if funcao == "DPS" else "❔"
+
+
+# Os embeds são memoizados pelo registro inteiro: qualquer mudança em um campo exibido
+# (score, ultima_atualizacao, disponibilidade...) gera uma chave nova. Quem recebe um embed
+# daqui só deve enviá-lo, nunca alterá-lo, porque a mesma instância é reaproveitada.
+
+def embed_perfil(dados: Sequence) -> discord.Embed:
+    """Embed de detalhes de um personagem a partir de uma linha com COLUNAS_PERFIL"""
+    return _embed_perfil(PerfilPersonagem._make(dados))
+
+
+@lru_cache(maxsize=CACHE_PERFIS)
+def _embed_perfil(p: PerfilPersonagem) -> discord.Embed:
+    embed = discord.Embed(title=f"Perfil de {p.personagem_nome}", color=discord.Color.blue())
+    embed.add_field(name="Classe", value=CLASSES.nome(p.personagem_classe) or "—", inline=True)
+    embed.add_field(name="Função", value=FUNCOES.nome(p.funcao) or "—", inline=True)
+    embed.add_field(name="Servidor", value=p.personagem_server or "—", inline=True)
+    embed.add_field(name="Armadura", value=ARMADURAS.nome(p.armadura) or "—", inline=True)
+    embed.add_field(name="Disponível", value="🟢 Sim" if p.disponibilidade else "🔴 Não", inline=True)
+    embed.add_field(name="Raider.IO", value=f"[Link]({p.raiderio_url})" if p.raiderio_url else "—", inline=False)
+    embed.add_field(name="Score M+", value=str(int(p.raiderio_score)) if p.raiderio_score else "—", inline=True)
+    embed.add_field(name="Última atualização", value=f"<t:{p.ultima_atualizacao}:f>" if p.ultima_atualizacao else "—", inline=True)
+    return embed
+
+
+def embed_lista_personagens(personagens: Sequence[Sequence], disponivel: Optional[bool] = None) -> discord.Embed:
+    """
+    Embed com os personagens de um usuário a partir de linhas com COLUNAS_RESUMO
+    `disponivel` colore o embed após uma mudança de disponibilidade geral
+    """
+    return _embed_lista(tuple(ResumoPersonagem._make(p) for p in personagens), disponivel)
+
+
+@lru_cache(maxsize=CACHE_LISTAS)
+def _embed_lista(personagens: Tuple[ResumoPersonagem, ...], disponivel: Optional[bool]) -> discord.Embed:
+    if disponivel is None:
+        cor = discord.Color.gold()
+    else:
+        cor = discord.Color.green() if disponivel else discord.Color.red()
+    embed = discord.Embed(
+        title="📋 Seus Personagens Registrados",
+        description=f"Você cadastrou {len(personagens)} de 4 personagens permitidos.",
+        color=cor
+    )
+    for p in personagens:
+        status = "🟢 Disponível" if p.disponibilidade else "🔴 Indisponível"
+        embed.add_field(
+            name=f"{icone_funcao(FUNCOES.nome(p.funcao))} {p.personagem_nome}",
+            value=f"Servidor: {p.personagem_server or '—'}\nScore Raider.IO: {int(p.raiderio_score or 0)}\nStatus: {status}",
+            inline=False
+        )
+    return embed
+
+
+def embed_boas_vindas() -> discord.Embed:
+    return discord.Embed(
+        title="🎉 Bem-vindo ao Cadastro do BakersM+!",
+        description=BOAS_VINDAS,
+        color=discord.Color.gold()
+    )
+
+
+def hash_embed(embed: discord.Embed) -> str:
+    """Hash estável do conteúdo de um embed, para saber se a mensagem publicada está atualizada"""
+    return hashlib.sha256(json.dumps(embed.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estatisticas_cache() -> dict:
+    perfis = _embed_perfil.cache_info()
+    listas = _embed_lista.cache_info()
+    return {
+        "perfis": perfis.currsize,
+        "perfis_hits": perfis.hits,
+        "listas": listas.currsize,
+        "listas_hits": listas.hits,
+    }
@@ -0,0 +1,223 @@
+from abc import ABC, abstractmethod
+from time import time
+from typing import Dict, Hashable, Optional
+from banco import PoolConexoes
+from rate_limit import Cooldown, JanelaDeslizante
+
+BACKENDS = {"memoria", "sqlite"}
+
+
+def _chave(chave: Hashable) -> str:
+    if isinstance(chave, tuple):
+        return ":".join(str(parte) for parte in chave)
+    return str(chave)
+
+
+def _estimativa_janela(inicio: float, atual: int, anterior: int, janela: float, agora: float) -> float:
+    """Mesma estimativa de JanelaDeslizante.contagem a partir da linha guardada"""
+    passadas = int((agora - inicio) // janela)
+    if passadas == 1:
+        inicio, atual, anterior = inicio + janela, 0, atual
+    elif passadas > 1:
+        return 0
+    return atual + anterior * (1 - (agora - inicio) / janela)
+
+
+class ArmazenamentoEstado(ABC):
+    """
+    Estado de controle das interações: cooldowns, reservas com prazo (cadastro em andamento),
+    limites por janela deslizante. Cada tipo de estado vive num `espaco`
+    ("botao", "raiderio", "cadastro"...). Todas as chaves são convertidas para texto.
+    """
+    async def abrir(self) -> None:
+        pass
+
+    async def fechar(self) -> None:
+        pass
+
+    @abstractmethod
+    async def cooldown_tentar(self, espaco: str, chave: Hashable, segundos: float) -> float:
+        """Se a chave pode agir, registra o uso e retorna 0; senão retorna os segundos restantes"""
+
+    @abstractmethod
+    async def cooldown_restante(self, espaco: str, chave: Hashable) -> float:
+        """Segundos até a chave poder agir de novo (0 se já pode)"""
+
+    async def reservar(self, espaco: str, chave: Hashable, ttl: float) -> bool:
+        """Marca a chave como ocupada por até `ttl` segundos; False se já estava ocupada"""
+        return await self.cooldown_tentar(espaco, chave, ttl) == 0
+
+    @abstractmethod
+    async def liberar(self, espaco: str, chave: Hashable) -> None:
+        """Libera uma reserva/cooldown antes do prazo"""
+
+    @abstractmethod
+    async def janela_registrar(self, espaco: str, chave: Hashable, limite: int, janela: float) -> bool:
+        """Registra um evento e retorna True se a chave atingiu `limite` eventos em `janela` segundos"""
+
+    @abstractmethod
+    async def expirar(self) -> int:
+        """Remove entradas vencidas e retorna quantas"""
+
+    @abstractmethod
+    def tamanhos(self) -> Dict[str, int]:
+        """Entradas em memória por espaço, para diagnóstico"""
+
+
+class EstadoMemoria(ArmazenamentoEstado):
+    """Estado no próprio processo: mais rápido, mas perdido ao reiniciar e não compartilhado"""
+    def __init__(self):
+        self._cooldowns: Dict[str, Cooldown] = {}
+        self._janelas: Dict[str, JanelaDeslizante] = {}
+
+    def _cooldown(self, espaco: str, segundos: float) -> Cooldown:
+        cooldown = self._cooldowns.get(espaco)
+        if cooldown is None:
+            cooldown = self._cooldowns[espaco] = Cooldown(segundos)
+        return cooldown
+
+    async def cooldown_tentar(self, espaco: str, chave: Hashable, segundos: float) -> float:
+        return self._cooldown(espaco, segundos).tentar(_chave(chave))
+
+    async def cooldown_restante(self, espaco: str, chave: Hashable) -> float:
+        cooldown = self._cooldowns.get(espaco)
+        return cooldown.restante(_chave(chave)) if cooldown else 0
+
+    async def liberar(self, espaco: str, chave: Hashable) -> None:
+        cooldown = self._cooldowns.get(espaco)
+        if cooldown is not None:
+            cooldown.remover(_chave(chave))
+
+    async def janela_registrar(self, espaco: str, chave: Hashable, limite: int, janela: float) -> bool:
+        limitador = self._janelas.get(espaco)
+        if limitador is None:
+            limitador = self._janelas[espaco] = JanelaDeslizante(limite, janela)
+        return limitador.registrar(_chave(chave))
+
+    async def expirar(self) -> int:
+        removidas = 0
+        for cooldown in self._cooldowns.values():
+            removidas += cooldown.expirar()
+        for limitador in self._janelas.values():
+            removidas += limitador.expirar()
+        return removidas
+
+    def tamanhos(self) -> Dict[str, int]:
+        tamanhos = {f"cooldowns_{espaco}": len(c) for espaco, c in self._cooldowns.items()}
+        tamanhos.update({f"janelas_{espaco}": len(j) for espaco, j in self._janelas.items()})
+        return tamanhos
+
+
+class EstadoSQLite(ArmazenamentoEstado):
+    """
+    Estado nas tabelas estado_* do banco do bot (migração 6).
+    Sobrevive a reinícios e é compartilhado por todos os processos que usam o mesmo arquivo.
+    Cada operação é um único UPSERT condicional, então dois processos não conseguem pegar o
+    mesmo cooldown. Os prazos usam o relógio de parede (epoch), válido entre processos.
+    Usa conexões próprias: as escritas de cada clique não esperam na fila do escritor do bot,
+    que também recebe os lotes do atualizador e as importações do roster.
+    """
+    def __init__(self, caminho: str, relogio=time):
+        self.db = PoolConexoes(caminho, leitores=1)
+        self.relogio = relogio
+        self._tamanhos: Dict[str, int] = {}
+
+    async def abrir(self) -> None:
+        await self.db.abrir()
+
+    async def fechar(self) -> None:
+        await self.db.fechar()
+
+    async def cooldown_tentar(self, espaco: str, chave: Hashable, segundos: float) -> float:
+        agora = self.relogio()
+        chave = _chave(chave)
+        async with self.db.escrita() as db:
+            cursor = await db.execute(
+                """
+                INSERT INTO estado_expiracoes (espaco, chave, expira_em) VALUES (?, ?, ?)
+                ON CONFLICT(espaco, chave) DO UPDATE SET expira_em = excluded.expira_em
+                WHERE estado_expiracoes.expira_em <= ?
+                """,
+                (espaco, chave, agora + segundos, agora)
+            )
+            if cursor.rowcount:
+                return 0
+            cursor = await db.execute(
+                "SELECT expira_em FROM estado_expiracoes WHERE espaco = ? AND chave = ?", (espaco, chave)
+            )
+            linha = await cursor.fetchone()
+        return max(0.0, linha[0] - agora) if linha else 0
+
+    async def cooldown_restante(self, espaco: str, chave: Hashable) -> float:
+        linha = await self.db.buscar_um(
+            "SELECT expira_em FROM estado_expiracoes WHERE espaco = ? AND chave = ?", (espaco, _chave(chave))
+        )
+        return max(0.0, linha[0] - self.relogio()) if linha else 0
+
+    async def liberar(self, espaco: str, chave: Hashable) -> None:
+        await self.db.executar(
+            "DELETE FROM estado_expiracoes WHERE espaco = ? AND chave = ?", (espaco, _chave(chave))
+        )
+
+    async def janela_registrar(self, espaco: str, chave: Hashable, limite: int, janela: float) -> bool:
+        agora = self.relogio()
+        chave = _chave(chave)
+        async with self.db.escrita() as db:
+            # Todas as expressões do SET leem os valores antigos da linha
+            await db.execute(
+                """
+                INSERT INTO estado_janelas (espaco, chave, inicio, atual, anterior, fim)
+                VALUES (:espaco, :chave, :agora, 1, 0, :agora + 2 * :janela)
+                ON CONFLICT(espaco, chave) DO UPDATE SET
+                    anterior = CASE
+                        WHEN :agora - inicio >= 2 * :janela THEN 0
+                        WHEN :agora - inicio >= :janela THEN atual
+                        ELSE anterior END,
+                    atual = CASE WHEN :agora - inicio >= :janela THEN 1 ELSE atual + 1 END,
+                    inicio = CASE
+                        WHEN :agora - inicio >= :janela
+                        THEN inicio + CAST((:agora - inicio) / :janela AS INTEGER) * :janela
+                        ELSE inicio END,
+                    fim = CASE
+                        WHEN :agora - inicio >= :janela
+                        THEN inicio + CAST((:agora - inicio) / :janela AS INTEGER) * :janela + 2 * :janela
+                        ELSE fim END
+                """,
+                {"espaco": espaco, "chave": chave, "agora": agora, "janela": janela}
+            )
+            cursor = await db.execute(
+                "SELECT inicio, atual, anterior FROM estado_janelas WHERE espaco = ? AND chave = ?",
+                (espaco, chave)
+            )
+            inicio, atual, anterior = await cursor.fetchone()
+        return _estimativa_janela(inicio, atual, anterior, janela, agora) >= limite
+
+    async def expirar(self) -> int:
+        agora = self.relogio()
+        async with self.db.escrita() as db:
+            cursor = await db.execute("DELETE FROM estado_expiracoes WHERE expira_em <= ?", (agora,))
+            removidas = cursor.rowcount
+            cursor = await db.execute("DELETE FROM estado_janelas WHERE fim <= ?", (agora,))
+            removidas += cursor.rowcount
+            cursor = await db.execute(
+                "SELECT 'expiracoes_' || espaco, COUNT(*) FROM estado_expiracoes GROUP BY espaco "
+                "UNION ALL SELECT 'janelas_' || espaco, COUNT(*) FROM estado_janelas GROUP BY espaco"
+            )
+            self._tamanhos = dict(await cursor.fetchall())
+        return removidas
+
+    def tamanhos(self) -> Dict[str, int]:
+        """Contagens da última expirar() (as entradas ficam no banco, não em memória)"""
+        return dict(self._tamanhos)
+
+
+def criar_estado(backend: str, caminho: Optional[str] = None) -> ArmazenamentoEstado:
+    """`caminho` é o arquivo SQLite do bot (as tabelas estado_* vêm das migrações dele)"""
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"ESTADO_BACKEND inválido: {backend} (use um de {sorted(BACKENDS)})")
+    if backend == "sqlite":
+        if caminho is None:
+            raise ValueError("O estado em SQLite precisa do caminho do banco do bot")
+        return EstadoSQLite(caminho)
+    return EstadoMemoria()
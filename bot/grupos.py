@@ -0,0 +1,131 @@
+import heapq
+from typing import Iterable, List, NamedTuple, Set
+from disponiveis import JogadorDisponivel
+
+DPS_POR_GRUPO = 3
+JANELA_DIVERSIDADE = 8  # Quantos DPS seguintes são considerados para evitar armadura/classe repetida
+
+
+class Grupo(NamedTuple):
+    tank: JogadorDisponivel
+    healer: JogadorDisponivel
+    dps: List[JogadorDisponivel]
+
+    @property
+    def membros(self) -> List[JogadorDisponivel]:
+        return [self.tank, self.healer, *self.dps]
+
+    @property
+    def media(self) -> float:
+        membros = self.membros
+        return sum(m.raiderio_score or 0 for m in membros) / len(membros)
+
+
+class ResultadoGrupos(NamedTuple):
+    grupos: List[Grupo]
+    reservas: List[JogadorDisponivel]
+
+
+def _score(jogador: JogadorDisponivel) -> float:
+    return jogador.raiderio_score or 0
+
+
+def _escolher_por_usuario(candidatos: List[JogadorDisponivel], limite: int, usados: Set[int]) -> List[JogadorDisponivel]:
+    """Os `limite` melhores candidatos (já ordenados por score) com usuários ainda não usados"""
+    escolhidos = []
+    vistos = set(usados)
+    for jogador in candidatos:
+        if len(escolhidos) >= limite:
+            break
+        if jogador.user_id in vistos:
+            continue
+        vistos.add(jogador.user_id)
+        escolhidos.append(jogador)
+    return escolhidos
+
+
+def _escolher_diverso(grupo: List[JogadorDisponivel], restantes: List[JogadorDisponivel]) -> int:
+    """Posição do melhor DPS próximo do topo com armadura nova no grupo; senão com classe nova; senão o topo"""
+    armaduras = {m.armadura for m in grupo}
+    classes = {m.personagem_classe for m in grupo}
+    classe_nova = None
+    for pos in range(min(JANELA_DIVERSIDADE, len(restantes))):
+        candidato = restantes[pos]
+        if candidato.armadura not in armaduras:
+            return pos
+        if classe_nova is None and candidato.personagem_classe not in classes:
+            classe_nova = pos
+    return classe_nova or 0
+
+
+def formar_grupos(disponiveis: Iterable[JogadorDisponivel], diversidade: bool = True) -> ResultadoGrupos:
+    """
+    Monta grupos de Mythic+ (1 Tank, 1 Healer, 3 DPS) a partir dos personagens disponíveis.
+
+    - Um mesmo usuário do Discord entra no máximo uma vez (em um único grupo)
+    - Funções escassas são preenchidas primeiro: Tanks, depois Healers, depois DPS
+    - O score médio é equilibrado: o melhor Tank fica com o Healer mais fraco, e cada DPS
+      vai para o grupo de menor soma de score naquele momento
+    - Com diversidade=True, evita repetir armadura/classe dentro do grupo quando possível
+
+    Custo O(n log n + n·g) para n personagens disponíveis e g grupos: cada redução do número
+    de grupos refaz a seleção por usuário, e cada DPS escolhido sai da lista com pop().
+    """
+    por_funcao = {"Tank": [], "Healer": [], "DPS": []}
+    for jogador in disponiveis:
+        if jogador.funcao in por_funcao:
+            por_funcao[jogador.funcao].append(jogador)
+    for lista in por_funcao.values():
+        lista.sort(key=_score, reverse=True)
+
+    usuarios = {j.user_id for lista in por_funcao.values() for j in lista}
+    maximo = min(
+        len({j.user_id for j in por_funcao["Tank"]}),
+        len({j.user_id for j in por_funcao["Healer"]}),
+        len({j.user_id for j in por_funcao["DPS"]}) // DPS_POR_GRUPO,
+        len(usuarios) // (2 + DPS_POR_GRUPO)
+    )
+
+    # Usuários com personagens em várias funções só podem ocupar uma; reduz o número de grupos
+    # até que todas as vagas possam ser preenchidas por usuários distintos
+    while maximo > 0:
+        usados: Set[int] = set()
+        tanks = _escolher_por_usuario(por_funcao["Tank"], maximo, usados)
+        usados.update(j.user_id for j in tanks)
+        healers = _escolher_por_usuario(por_funcao["Healer"], maximo, usados)
+        usados.update(j.user_id for j in healers)
+        dps = _escolher_por_usuario(por_funcao["DPS"], maximo * DPS_POR_GRUPO, usados)
+        if len(tanks) == maximo and len(healers) == maximo and len(dps) == maximo * DPS_POR_GRUPO:
+            break
+        maximo = min(maximo - 1, len(tanks), len(healers), len(dps) // DPS_POR_GRUPO)
+    else:
+        reservas = sorted((j for lista in por_funcao.values() for j in lista), key=_score, reverse=True)
+        return ResultadoGrupos([], reservas)
+
+    # Melhor Tank com o Healer mais fraco
+    healers.reverse()
+    membros = [[tank, healer] for tank, healer in zip(tanks, healers)]
+
+    # A cada rodada, cada grupo recebe um DPS; o grupo mais fraco escolhe primeiro
+    restantes = dps
+    for _ in range(DPS_POR_GRUPO):
+        fila = [(sum(_score(m) for m in grupo), i) for i, grupo in enumerate(membros)]
+        heapq.heapify(fila)
+        while fila:
+            _, i = heapq.heappop(fila)
+            grupo = membros[i]
+            escolha = 0
+            if diversidade:
+                escolha = _escolher_diverso(grupo, restantes)
+            grupo.append(restantes.pop(escolha))
+
+    grupos = [Grupo(g[0], g[1], g[2:]) for g in membros]
+    grupos.sort(key=lambda g: g.media, reverse=True)
+
+    usados = {m.user_id for g in grupos for m in g.membros}
+    reservas = sorted(
+        (j for lista in por_funcao.values() for j in lista if j.user_id not in usados),
+        key=_score,
+        reverse=True
+    )
+    return ResultadoGrupos(grupos, reservas)
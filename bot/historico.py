@@ -0,0 +1,94 @@
+import aiosqlite
+from time import time
+from typing import List, Optional, Tuple
+
+# As linhas de historico_scores são gravadas pelos triggers da migração 4, só quando o score muda.
+DIAS_DETALHADO = 14  # Até aqui guarda todas as mudanças
+DIAS_RETENCAO = 400  # Depois disso apaga (mantendo sempre o último ponto de cada personagem)
+SEGUNDOS_DIA = 86400
+
+BARRAS = "▁▂▃▄▅▆▇█"
+
+
+async def buscar_historico(
+    db_conn: aiosqlite.Connection,
+    jogador_id: int,
+    desde: int,
+    ate: Optional[int] = None
+) -> List[Tuple[int, float]]:
+    """
+    Pontos (momento, score) de um personagem no período, em ordem cronológica.
+    Inclui o último ponto anterior a `desde`, que é o score vigente no início do período.
+    """
+    ate = int(time()) if ate is None else ate
+    cursor = await db_conn.execute(
+        "SELECT momento, score FROM historico_scores "
+        "WHERE jogador_id = ? AND momento < ? ORDER BY momento DESC LIMIT 1",
+        (jogador_id, desde)
+    )
+    anterior = await cursor.fetchone()
+    cursor = await db_conn.execute(
+        "SELECT momento, score FROM historico_scores "
+        "WHERE jogador_id = ? AND momento BETWEEN ? AND ? ORDER BY momento",
+        (jogador_id, desde, ate)
+    )
+    pontos = [tuple(linha) for linha in await cursor.fetchall()]
+    if anterior:
+        pontos.insert(0, tuple(anterior))
+    return pontos
+
+
+async def compactar_historico(
+    db_conn: aiosqlite.Connection,
+    agora: Optional[int] = None,
+    dias_detalhado: int = DIAS_DETALHADO,
+    dias_retencao: int = DIAS_RETENCAO
+) -> Tuple[int, int]:
+    """
+    Reduz o histórico antigo: pontos com mais de `dias_detalhado` dias ficam com um por dia
+    (o último do dia) e pontos com mais de `dias_retencao` dias são apagados, exceto o mais
+    recente de cada personagem. Retorna (pontos reduzidos, pontos expirados).
+    """
+    agora = int(time()) if agora is None else agora
+    limite_detalhado = agora - dias_detalhado * SEGUNDOS_DIA
+    limite_retencao = agora - dias_retencao * SEGUNDOS_DIA
+
+    cursor = await db_conn.execute(
+        """
+        DELETE FROM historico_scores AS h
+        WHERE h.momento < ? AND EXISTS (
+            SELECT 1 FROM historico_scores AS posterior
+            WHERE posterior.jogador_id = h.jogador_id
+              AND posterior.momento > h.momento
+              AND posterior.momento < (h.momento / ? + 1) * ?
+        )
+        """,
+        (limite_detalhado, SEGUNDOS_DIA, SEGUNDOS_DIA)
+    )
+    reduzidos = cursor.rowcount
+
+    cursor = await db_conn.execute(
+        """
+        DELETE FROM historico_scores AS h
+        WHERE h.momento < ? AND EXISTS (
+            SELECT 1 FROM historico_scores AS posterior
+            WHERE posterior.jogador_id = h.jogador_id AND posterior.momento > h.momento
+        )
+        """,
+        (limite_retencao,)
+    )
+    return reduzidos, cursor.rowcount
+
+
+def sparkline(valores: List[float], largura: int = 30) -> str:
+    """Gráfico de uma linha com blocos unicode, reamostrado para no máximo `largura` colunas"""
+    if not valores:
+        return ""
+    if len(valores) > largura:
+        passo = len(valores) / largura
+        valores = [valores[min(len(valores) - 1, int((i + 1) * passo) - 1)] for i in range(largura)]
+    minimo, maximo = min(valores), max(valores)
+    if maximo == minimo:
+        return BARRAS[len(BARRAS) // 2] * len(valores)
+    escala = (len(BARRAS) - 1) / (maximo - minimo)
+    return "".join(BARRAS[round((v - minimo) * escala)] for v in valores)
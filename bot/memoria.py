@@ -0,0 +1,74 @@
+import gc
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+FRAMES_PADRAO = 10  # Profundidade do traceback guardado por alocação
+
+
+class MonitorMemoria:
+    """
+    Instrumentação de memória sob demanda.
+    Nada roda periodicamente: o tracemalloc só é ligado quando pedido, e cada relatório
+    compara o snapshot atual com o anterior para mostrar onde a memória cresceu.
+    """
+    def __init__(self, tamanhos: Callable[[], Dict[str, int]]):
+        self.tamanhos = tamanhos
+        self._ultimo_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def ativo(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def iniciar(self, frames: int = FRAMES_PADRAO) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._ultimo_snapshot = self._snapshot()
+
+    def parar(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._ultimo_snapshot = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def diferenca(self, top: int = 10) -> List[str]:
+        """Maiores crescimentos de memória desde o último snapshot (por linha de código)"""
+        if not self.ativo:
+            return []
+        atual = self._snapshot()
+        anterior = self._ultimo_snapshot
+        self._ultimo_snapshot = atual
+        if anterior is None:
+            estatisticas = atual.statistics("lineno")[:top]
+        else:
+            estatisticas = atual.compare_to(anterior, "lineno")[:top]
+        return [str(e) for e in estatisticas]
+
+    @staticmethod
+    def contar_objetos(tipo_base: type) -> Dict[str, int]:
+        """Instâncias vivas de subclasses de `tipo_base` (percorre o heap sem forçar coleta)"""
+        contagem = Counter(type(obj).__name__ for obj in gc.get_objects() if isinstance(obj, tipo_base))
+        return dict(contagem.most_common())
+
+    def relatorio(self, tipo_view: type, top: int = 10) -> str:
+        linhas = ["== Estruturas =="]
+        linhas += [f"{nome}: {tamanho}" for nome, tamanho in self.tamanhos().items()]
+
+        linhas.append("== Views vivas ==")
+        views = self.contar_objetos(tipo_view)
+        linhas += [f"{nome}: {qtd}" for nome, qtd in views.items()] or ["nenhuma"]
+
+        linhas.append("== tracemalloc ==")
+        if self.ativo:
+            atual, pico = tracemalloc.get_traced_memory()
+            linhas.append(f"atual: {atual / 1024:.0f} KiB, pico: {pico / 1024:.0f} KiB")
+            linhas += self.diferenca(top) or ["sem alocações registradas"]
+        else:
+            linhas.append("desligado (use a ação iniciar)")
+        return "\n".join(linhas)
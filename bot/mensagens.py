@@ -40,6 +40,10 @@ RAIDERIO_INVALIDO = (
     "❌ Erro ao validar perfil no Raider.IO. Verifique o link."
 )
 
+RAIDERIO_INDISPONIVEL = (
+    "⚠️ O Raider.IO não está respondendo no momento. Tente novamente em alguns minutos."
+)
+
 PERFIL_VAZIO = (
     "❌ Você ainda não registrou nenhum personagem com este ID."
 )
@@ -114,4 +118,60 @@ LINK_RAIDERIO_NAO_ENCONTRADO = (
     "❌ Link Raider.IO não encontrado para este personagem."
 )
 
+SEM_GRUPOS = (
+    "❌ Não há jogadores disponíveis suficientes para formar um grupo (1 Tank, 1 Healer e 3 DPS)."
+)
+
+ERRO_FORMAR_GRUPOS = (
+    "❌ Erro ao formar grupos. Tente novamente."
+)
+
+SEM_DISPONIVEIS = (
+    "❌ Nenhum jogador disponível com esses filtros."
+)
+
+ERRO_LISTAR_DISPONIVEIS = (
+    "❌ Erro ao listar jogadores disponíveis. Tente novamente."
+)
+
+SEM_PERMISSAO_COMANDO = (
+    "🚫 Apenas o dono do bot pode usar este comando."
+)
+
+SEM_HISTORICO = (
+    "❌ Nenhum histórico de score encontrado para este personagem."
+)
+
+ERRO_HISTORICO = (
+    "❌ Erro ao carregar o histórico. Tente novamente."
+)
+
+CONFIGURACAO_SALVA = lambda canal: f"✅ Canal de instruções definido para {canal}."
+
+ERRO_CONFIGURAR = (
+    "❌ Erro ao salvar a configuração. Verifique se o bot pode enviar mensagens no canal."
+)
+
+ROSTER_VAZIO = (
+    "❌ Nenhum personagem cadastrado neste servidor para exportar."
+)
+
+ROSTER_EXPORTADO = lambda partes: (
+    "✅ Roster exportado." if partes == 1 else f"✅ Roster exportado em {partes} partes."
+)
+
+ERRO_EXPORTAR = (
+    "❌ Erro ao exportar o roster. Tente novamente."
+)
+
+ROSTER_FORMATO_INVALIDO = (
+    "❌ Envie um arquivo `.csv` ou `.jsonl` no formato gerado pelo `/exportar`."
+)
+
+ROSTER_IMPORTADO = lambda resumo: f"✅ Importação concluída.\n```\n{resumo[:1800]}\n```"
+
+ERRO_IMPORTAR = (
+    "❌ Erro ao importar o roster; nenhuma alteração foi gravada."
+)
+
 # Adicione outros textos conforme necessário...
\ No newline at end of file
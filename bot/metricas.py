@@ -0,0 +1,196 @@
+import functools
+from aiohttp import web
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _formatar_labels(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monotônico, opcionalmente separado por labels"""
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, labels: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, valor: float = 1, **labels: str) -> None:
+        chave = tuple(str(labels[nome]) for nome in self.labels)
+        self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def exportar(self) -> List[str]:
+        return [
+            f"{self.nome}{_formatar_labels(self.labels, chave)} {_formatar_numero(valor)}"
+            for chave, valor in self._valores.items()
+        ]
+
+
+class Medidor:
+    """Valor instantâneo lido de uma função no momento da coleta"""
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, funcao: Callable[[], float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+
+    def exportar(self) -> List[str]:
+        return [f"{self.nome} {_formatar_numero(self.funcao())}"]
+
+
+class Histograma:
+    """Histograma de latências com buckets cumulativos no formato do Prometheus"""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, labels: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # chave de labels -> [contagens por bucket (não cumulativas) + overflow, soma]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observar(self, valor: float, **labels: str) -> None:
+        chave = tuple(str(labels[nome]) for nome in self.labels)
+        serie = self._series.get(chave)
+        if serie is None:
+            serie = self._series[chave] = ([0] * (len(self.buckets) + 1), [0.0])
+        contagens, soma = serie
+        contagens[bisect_left(self.buckets, valor)] += 1
+        soma[0] += valor
+
+    @contextmanager
+    def cronometrar(self, **labels: str) -> Iterator[None]:
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(perf_counter() - inicio, **labels)
+
+    def exportar(self) -> List[str]:
+        linhas = []
+        for chave, (contagens, soma) in self._series.items():
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, float("inf")), contagens):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(float(limite))}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_labels(self.labels, chave, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatar_labels(self.labels, chave)} {_formatar_numero(soma[0])}")
+            linhas.append(f"{self.nome}_count{_formatar_labels(self.labels, chave)} {acumulado}")
+        return linhas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+
+    def registrar(self, metrica):
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas.values():
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            try:
+                linhas.extend(metrica.exportar())
+            except Exception as e:
+                print(f"[ERRO METRICAS] {metrica.nome}: {e}")
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas()
+
+INTERACAO_SEGUNDOS = registro.registrar(Histograma(
+    "bot_interacao_segundos", "Duração dos handlers de comandos e botões", ("tipo", "nome")
+))
+INTERACAO_ERROS = registro.registrar(Contador(
+    "bot_interacao_erros_total", "Exceções não tratadas nos handlers", ("tipo", "nome")
+))
+RAIDERIO_SEGUNDOS = registro.registrar(Histograma(
+    "bot_raiderio_requisicao_segundos", "Latência das requisições à API do Raider.IO"
+))
+RAIDERIO_RESPOSTAS = registro.registrar(Contador(
+    "bot_raiderio_respostas_total", "Respostas da API do Raider.IO por status", ("status",)
+))
+INICIALIZACAO_SEGUNDOS = registro.registrar(Histograma(
+    "bot_inicializacao_segundos", "Duração de cada fase da inicialização do bot", ("fase",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+))
+TRABALHO_SEGUNDOS = registro.registrar(Histograma(
+    "bot_trabalho_segundos", "Duração dos trabalhos em segundo plano das interações (defer + follow-up)",
+    ("nome", "resultado")
+))
+SQLITE_SEGUNDOS = registro.registrar(Histograma(
+    "bot_sqlite_segundos", "Tempo de uso de uma conexão do pool SQLite", ("operacao",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+))
+
+
+def medir_interacao(tipo: str, nome: Optional[str] = None):
+    """Decorator que registra a duração de um comando/callback em bot_interacao_segundos"""
+    def decorator(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            inicio = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                INTERACAO_ERROS.inc(tipo=tipo, nome=rotulo)
+                raise
+            finally:
+                INTERACAO_SEGUNDOS.observar(perf_counter() - inicio, tipo=tipo, nome=rotulo)
+        return wrapper
+    return decorator
+
+
+class ServidorMetricas:
+    """Servidor HTTP local que expõe /metrics no formato texto do Prometheus"""
+    def __init__(self, registro_metricas: RegistroMetricas, host: str = "127.0.0.1", porta: int = 9108):
+        self.registro = registro_metricas
+        self.host = host
+        self.porta = porta
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registro.exportar().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    async def iniciar(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.porta).start()
+        print(f"[METRICAS] Servindo em http://{self.host}:{self.porta}/metrics")
+
+    async def parar(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
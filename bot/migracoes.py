@@ -0,0 +1,370 @@
+import aiosqlite
+
+# Cada migração é (versão, descrição, [comandos SQL]).
+# A versão aplicada fica em PRAGMA user_version; nunca altere uma migração já publicada,
+# adicione uma nova no final da lista.
+MIGRACOES = [
+    (1, "tabela jogadores", [
+        """
+        CREATE TABLE IF NOT EXISTS jogadores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            nome TEXT,
+            funcao TEXT,
+            armadura TEXT,
+            disponibilidade INTEGER DEFAULT 0,
+            raiderio_url TEXT,
+            raiderio_score REAL,
+            personagem_nome TEXT,
+            personagem_classe TEXT,
+            personagem_server TEXT,
+            ultima_atualizacao TEXT,
+            UNIQUE(user_id, personagem_nome)
+        )
+        """,
+    ]),
+    (2, "índices de nome e de disponíveis por score", [
+        # Checagem de personagem duplicado: WHERE LOWER(personagem_nome) = LOWER(?)
+        "CREATE INDEX IF NOT EXISTS idx_jogadores_nome_lower ON jogadores(LOWER(personagem_nome))",
+        # Lista de disponíveis ordenada por score, coberta pelo índice (sem acessar a tabela)
+        """
+        CREATE INDEX IF NOT EXISTS idx_jogadores_disponiveis_score
+        ON jogadores(raiderio_score DESC, user_id, nome, funcao, personagem_classe, personagem_nome, personagem_server)
+        WHERE disponibilidade = 1
+        """,
+    ]),
+    (3, "índices de paginação por (score, id) dos disponíveis", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_jogadores_disponiveis_pagina
+        ON jogadores(raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_jogadores_disponiveis_funcao_pagina
+        ON jogadores(funcao, raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+    ]),
+    (4, "histórico de scores", [
+        # Um ponto por mudança de score; a chave (jogador_id, momento) agrupa fisicamente
+        # o histórico de cada personagem, então consultas por período são uma varredura contínua
+        """
+        CREATE TABLE IF NOT EXISTS historico_scores (
+            jogador_id INTEGER NOT NULL,
+            momento INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (jogador_id, momento)
+        ) WITHOUT ROWID
+        """,
+        # Grava só quando o score muda, qualquer que seja o caminho da escrita
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_historico_scores_insert
+        AFTER INSERT ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_historico_scores_update
+        AFTER UPDATE OF raiderio_score ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL AND NEW.raiderio_score IS NOT OLD.raiderio_score
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_historico_scores_delete
+        AFTER DELETE ON jogadores
+        BEGIN
+            DELETE FROM historico_scores WHERE jogador_id = OLD.id;
+        END
+        """,
+        # Ponto de partida: o score atual de quem já está cadastrado
+        """
+        INSERT OR IGNORE INTO historico_scores (jogador_id, momento, score)
+        SELECT id,
+               COALESCE(CAST(strftime('%s', ultima_atualizacao) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER)),
+               raiderio_score
+        FROM jogadores
+        WHERE raiderio_score IS NOT NULL
+        """,
+    ]),
+    (5, "servidor (guild_id) em jogadores e configuração por servidor", [
+        # SQLite não altera UNIQUE de uma tabela existente: recria jogadores com a chave
+        # (guild_id, user_id, personagem_nome), preservando os ids (o histórico aponta para eles).
+        # Linhas antigas ficam com guild_id NULL até o bot atribuí-las ao servidor original.
+        "DROP TRIGGER IF EXISTS trg_historico_scores_insert",
+        "DROP TRIGGER IF EXISTS trg_historico_scores_update",
+        "DROP TRIGGER IF EXISTS trg_historico_scores_delete",
+        """
+        CREATE TABLE jogadores_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id TEXT,
+            user_id TEXT,
+            nome TEXT,
+            funcao TEXT,
+            armadura TEXT,
+            disponibilidade INTEGER DEFAULT 0,
+            raiderio_url TEXT,
+            raiderio_score REAL,
+            personagem_nome TEXT,
+            personagem_classe TEXT,
+            personagem_server TEXT,
+            ultima_atualizacao TEXT,
+            UNIQUE(guild_id, user_id, personagem_nome)
+        )
+        """,
+        """
+        INSERT INTO jogadores_nova (
+            id, user_id, nome, funcao, armadura, disponibilidade, raiderio_url, raiderio_score,
+            personagem_nome, personagem_classe, personagem_server, ultima_atualizacao
+        )
+        SELECT id, user_id, nome, funcao, armadura, disponibilidade, raiderio_url, raiderio_score,
+               personagem_nome, personagem_classe, personagem_server, ultima_atualizacao
+        FROM jogadores
+        """,
+        "DROP TABLE jogadores",
+        "ALTER TABLE jogadores_nova RENAME TO jogadores",
+        # Os índices das migrações 2 e 3, agora com o servidor na frente
+        "CREATE INDEX idx_jogadores_guild_nome_lower ON jogadores(guild_id, LOWER(personagem_nome))",
+        """
+        CREATE INDEX idx_jogadores_disponiveis_score
+        ON jogadores(guild_id, raiderio_score DESC, user_id, nome, funcao, personagem_classe, personagem_nome, personagem_server)
+        WHERE disponibilidade = 1
+        """,
+        """
+        CREATE INDEX idx_jogadores_disponiveis_pagina
+        ON jogadores(guild_id, raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+        """
+        CREATE INDEX idx_jogadores_disponiveis_funcao_pagina
+        ON jogadores(guild_id, funcao, raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+        # Os triggers da migração 4
+        """
+        CREATE TRIGGER trg_historico_scores_insert
+        AFTER INSERT ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_historico_scores_update
+        AFTER UPDATE OF raiderio_score ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL AND NEW.raiderio_score IS NOT OLD.raiderio_score
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_historico_scores_delete
+        AFTER DELETE ON jogadores
+        BEGIN
+            DELETE FROM historico_scores WHERE jogador_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS config_guild (
+            guild_id TEXT PRIMARY KEY,
+            canal_instrucoes_id TEXT,
+            boasvindas_msg_id TEXT
+        )
+        """,
+    ]),
+    (6, "estado compartilhado entre processos (cooldowns, limites e contadores)", [
+        # Cooldowns e reservas: a chave está bloqueada até expira_em (epoch em segundos)
+        """
+        CREATE TABLE IF NOT EXISTS estado_expiracoes (
+            espaco TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            expira_em REAL NOT NULL,
+            PRIMARY KEY (espaco, chave)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_estado_expiracoes_expira_em ON estado_expiracoes(expira_em)",
+        # Contadores de janela deslizante (janela fixa atual + anterior)
+        """
+        CREATE TABLE IF NOT EXISTS estado_janelas (
+            espaco TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            inicio REAL NOT NULL,
+            atual INTEGER NOT NULL,
+            anterior INTEGER NOT NULL,
+            fim REAL NOT NULL,
+            PRIMARY KEY (espaco, chave)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_estado_janelas_fim ON estado_janelas(fim)",
+        # Contadores por processo; linhas sem heartbeat recente são de processos que morreram
+        """
+        CREATE TABLE IF NOT EXISTS estado_contadores (
+            espaco TEXT NOT NULL,
+            processo TEXT NOT NULL,
+            valor INTEGER NOT NULL,
+            atualizado_em REAL NOT NULL,
+            PRIMARY KEY (espaco, processo)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (7, "metadados do bot e hash da mensagem de boas-vindas", [
+        # Pares chave/valor do próprio bot (ex.: hash da árvore de comandos sincronizada)
+        """
+        CREATE TABLE IF NOT EXISTS metadados (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+        """,
+        "ALTER TABLE config_guild ADD COLUMN boasvindas_hash TEXT",
+    ]),
+    (8, "ids inteiros, códigos para função/armadura/classe e datas em epoch", [
+        # Recria jogadores com snowflakes INTEGER (8 bytes em vez de ~19 de texto), função,
+        # armadura e classe como códigos de 1 byte (bot/codigos.py) e ultima_atualizacao em epoch
+        # UTC, que antes misturava "AAAA-MM-DD HH:MM:SS" e "AAAA-MM-DD". Os ids são preservados.
+        # Armadura "Unknown" e classes fora da tabela viram NULL.
+        "DROP TRIGGER IF EXISTS trg_historico_scores_insert",
+        "DROP TRIGGER IF EXISTS trg_historico_scores_update",
+        "DROP TRIGGER IF EXISTS trg_historico_scores_delete",
+        """
+        CREATE TABLE jogadores_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            nome TEXT,
+            funcao INTEGER,
+            armadura INTEGER,
+            disponibilidade INTEGER NOT NULL DEFAULT 0,
+            raiderio_url TEXT,
+            raiderio_score REAL,
+            personagem_nome TEXT,
+            personagem_classe INTEGER,
+            personagem_server TEXT,
+            ultima_atualizacao INTEGER,
+            UNIQUE(guild_id, user_id, personagem_nome)
+        )
+        """,
+        """
+        INSERT INTO jogadores_nova (
+            id, guild_id, user_id, nome, funcao, armadura, disponibilidade, raiderio_url, raiderio_score,
+            personagem_nome, personagem_classe, personagem_server, ultima_atualizacao
+        )
+        SELECT id,
+               CAST(guild_id AS INTEGER),
+               CAST(user_id AS INTEGER),
+               nome,
+               CASE funcao WHEN 'Tank' THEN 1 WHEN 'Healer' THEN 2 WHEN 'DPS' THEN 3 END,
+               CASE armadura WHEN 'Cloth' THEN 1 WHEN 'Leather' THEN 2 WHEN 'Mail' THEN 3 WHEN 'Plate' THEN 4 END,
+               COALESCE(disponibilidade, 0),
+               raiderio_url,
+               raiderio_score,
+               personagem_nome,
+               CASE personagem_classe
+                   WHEN 'Death Knight' THEN 1 WHEN 'Demon Hunter' THEN 2 WHEN 'Druid' THEN 3
+                   WHEN 'Evoker' THEN 4 WHEN 'Hunter' THEN 5 WHEN 'Mage' THEN 6 WHEN 'Monk' THEN 7
+                   WHEN 'Paladin' THEN 8 WHEN 'Priest' THEN 9 WHEN 'Rogue' THEN 10 WHEN 'Shaman' THEN 11
+                   WHEN 'Warlock' THEN 12 WHEN 'Warrior' THEN 13
+               END,
+               personagem_server,
+               CAST(strftime('%s', ultima_atualizacao) AS INTEGER)
+        FROM jogadores
+        """,
+        "DROP TABLE jogadores",
+        "ALTER TABLE jogadores_nova RENAME TO jogadores",
+        # Os índices da migração 5 (DROP TABLE levou os antigos junto)
+        "CREATE INDEX idx_jogadores_guild_nome_lower ON jogadores(guild_id, LOWER(personagem_nome))",
+        """
+        CREATE INDEX idx_jogadores_disponiveis_score
+        ON jogadores(guild_id, raiderio_score DESC, user_id, nome, funcao, personagem_classe, personagem_nome, personagem_server)
+        WHERE disponibilidade = 1
+        """,
+        """
+        CREATE INDEX idx_jogadores_disponiveis_pagina
+        ON jogadores(guild_id, raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+        """
+        CREATE INDEX idx_jogadores_disponiveis_funcao_pagina
+        ON jogadores(guild_id, funcao, raiderio_score DESC, id DESC)
+        WHERE disponibilidade = 1
+        """,
+        # Os triggers da migração 4
+        """
+        CREATE TRIGGER trg_historico_scores_insert
+        AFTER INSERT ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_historico_scores_update
+        AFTER UPDATE OF raiderio_score ON jogadores
+        WHEN NEW.raiderio_score IS NOT NULL AND NEW.raiderio_score IS NOT OLD.raiderio_score
+        BEGIN
+            INSERT OR REPLACE INTO historico_scores (jogador_id, momento, score)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.raiderio_score);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_historico_scores_delete
+        AFTER DELETE ON jogadores
+        BEGIN
+            DELETE FROM historico_scores WHERE jogador_id = OLD.id;
+        END
+        """,
+        # config_guild com o servidor como chave inteira (vira o próprio rowid)
+        """
+        CREATE TABLE config_guild_nova (
+            guild_id INTEGER PRIMARY KEY,
+            canal_instrucoes_id INTEGER,
+            boasvindas_msg_id INTEGER,
+            boasvindas_hash TEXT
+        )
+        """,
+        """
+        INSERT INTO config_guild_nova (guild_id, canal_instrucoes_id, boasvindas_msg_id, boasvindas_hash)
+        SELECT CAST(guild_id AS INTEGER), CAST(NULLIF(canal_instrucoes_id, '') AS INTEGER),
+               CAST(NULLIF(boasvindas_msg_id, '') AS INTEGER), boasvindas_hash
+        FROM config_guild
+        """,
+        "DROP TABLE config_guild",
+        "ALTER TABLE config_guild_nova RENAME TO config_guild",
+    ]),
+    (9, "remove os contadores por processo do estado compartilhado", [
+        # Sem uso desde que os menus viraram botões persistentes (não há mais views por usuário)
+        "DROP TABLE IF EXISTS estado_contadores",
+    ]),
+]
+
+
+async def versao_atual(db_conn: aiosqlite.Connection) -> int:
+    cursor = await db_conn.execute("PRAGMA user_version")
+    return (await cursor.fetchone())[0]
+
+
+async def aplicar_migracoes(db_conn: aiosqlite.Connection) -> int:
+    """Aplica, em ordem e cada uma em sua transação, as migrações ainda não aplicadas"""
+    versao = await versao_atual(db_conn)
+    for numero, descricao, comandos in MIGRACOES:
+        if numero <= versao:
+            continue
+        try:
+            await db_conn.execute("BEGIN")
+            for sql in comandos:
+                await db_conn.execute(sql)
+            await db_conn.execute(f"PRAGMA user_version = {numero}")
+            await db_conn.commit()
+        except Exception:
+            await db_conn.rollback()
+            raise
+        versao = numero
+        print(f"[MIGRACAO] v{numero} aplicada: {descricao}")
+    return versao
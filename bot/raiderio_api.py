@@ -1,24 +1,241 @@
 import aiohttp
+import asyncio
+import random
 import re
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+from time import monotonic, perf_counter
+from cache import CacheTTL
+from metricas import RAIDERIO_RESPOSTAS, RAIDERIO_SEGUNDOS
 
-async def obter_score_raiderio(url: str) -> tuple:
+API_URL = "https://raider.io/api/v1/characters/profile"
+
+# Pool de conexões do cliente Raider.IO
+POOL_LIMITE_TOTAL = 100  # Máximo de conexões abertas no total
+POOL_LIMITE_POR_HOST = 20  # Máximo de conexões simultâneas com raider.io
+POOL_KEEPALIVE_SEGUNDOS = 60  # Tempo que uma conexão ociosa fica aberta para reuso
+DNS_CACHE_SEGUNDOS = 600  # Tempo de cache do DNS de raider.io
+
+# Cache de perfis
+CACHE_TTL_SEGUNDOS = 180  # Perfil servido direto do cache
+CACHE_STALE_SEGUNDOS = 900  # Depois do TTL, servido do cache enquanto revalida em segundo plano
+CACHE_MAX_PERFIS = 2048  # Máximo de perfis em memória (LRU)
+
+# Timeouts e novas tentativas
+TIMEOUT_REQUISICAO_SEGUNDOS = 5  # Tempo máximo de uma requisição
+TIMEOUT_CONEXAO_SEGUNDOS = 2  # Tempo máximo para abrir a conexão
+MAX_TENTATIVAS = 3  # Tentativas por consulta (429, 5xx, timeout e falha de rede)
+BACKOFF_BASE_SEGUNDOS = 0.5  # Espera base antes da segunda tentativa (dobra a cada tentativa)
+BACKOFF_MAX_SEGUNDOS = 4  # Teto da espera entre tentativas
+PRAZO_TOTAL_SEGUNDOS = 12  # Tempo máximo somando todas as tentativas e esperas
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+# Circuit breaker
+CIRCUITO_LIMITE_FALHAS = 5  # Falhas seguidas que abrem o circuito
+CIRCUITO_ABERTO_SEGUNDOS = 30  # Tempo rejeitando consultas antes de testar a API de novo
+
+
+class RaiderIOIndisponivel(Exception):
+    """A API do Raider.IO não respondeu (timeout, 429, 5xx) ou o circuito está aberto"""
+
+
+class CircuitBreaker:
     """
-    Obtém informações do personagem no Raider.IO
-    Retorna (score, classe, server) ou (None, None, None) se erro
+    Circuit breaker de falhas consecutivas.
+    Fechado: tudo passa. Depois de `limite_falhas` falhas seguidas abre e rejeita na hora
+    por `tempo_aberto` segundos; então fica meio-aberto e libera uma única consulta de teste,
+    que fecha o circuito se der certo ou o reabre se falhar.
     """
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, limite_falhas: int = CIRCUITO_LIMITE_FALHAS, tempo_aberto: float = CIRCUITO_ABERTO_SEGUNDOS,
+                 relogio=monotonic):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.relogio = relogio
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+
+    def permitir(self) -> bool:
+        if self.estado == self.FECHADO:
+            return True
+        if self.estado == self.ABERTO:
+            if self.relogio() < self._aberto_ate:
+                return False
+            self.estado = self.MEIO_ABERTO
+            self._teste_em_andamento = False
+        if self._teste_em_andamento:
+            return False
+        self._teste_em_andamento = True
+        return True
+
+    def sucesso(self) -> None:
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._teste_em_andamento = False
+
+    def falha(self) -> None:
+        self.falhas += 1
+        if self.estado == self.MEIO_ABERTO or self.falhas >= self.limite_falhas:
+            if self.estado != self.ABERTO:
+                print(f"[RAIDERIO] Circuito aberto por {self.tempo_aberto}s após {self.falhas} falhas")
+            self.estado = self.ABERTO
+            self._aberto_ate = self.relogio() + self.tempo_aberto
+            self._teste_em_andamento = False
+
+
+def _retry_after(valor: Optional[str]) -> Optional[float]:
+    """Segundos pedidos pelo header Retry-After (número ou data HTTP)"""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
     try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+def extrair_personagem(url: str) -> Optional[tuple]:
+    """Extrai (região, reino, nome) do link do Raider.IO ou None se inválido"""
+    pattern = r"characters/(\w+)/([^/]+)/([^/]+)"
+    match = re.search(pattern, url)
+    if not match:
+        return None
+    return match.groups()
+
+
+def chave_personagem(personagem: tuple) -> tuple:
+    """Chave normalizada (região, reino, nome) usada no cache"""
+    region, realm, name = personagem
+    return region.lower(), realm.lower(), name.lower()
+
+
+class RaiderIOClient:
+    """
+    Cliente de longa duração do Raider.IO.
+    Mantém uma única ClientSession com pool de conexões keep-alive e cache de DNS,
+    evitando um novo handshake TLS a cada consulta. Perfis consultados recentemente
+    são servidos de um cache TTL com stale-while-revalidate, e consultas simultâneas
+    ao mesmo personagem compartilham uma única requisição.
+    Falhas da API (timeout, 429, 5xx) são repetidas com backoff e, se persistirem, abrem um
+    circuit breaker; nesses casos é levantado RaiderIOIndisponivel em vez de tratar o
+    perfil como inválido.
+    """
+    def __init__(
+        self,
+        cache_ttl: float = CACHE_TTL_SEGUNDOS,
+        cache_stale: float = CACHE_STALE_SEGUNDOS,
+        cache_max: int = CACHE_MAX_PERFIS,
+        api_url: str = API_URL,
+        max_tentativas: int = MAX_TENTATIVAS,
+        timeout: float = TIMEOUT_REQUISICAO_SEGUNDOS,
+        circuito: Optional[CircuitBreaker] = None
+    ):
+        self.api_url = api_url
+        self.max_tentativas = max(1, max_tentativas)
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, TIMEOUT_CONEXAO_SEGUNDOS))
+        self.circuito = circuito or CircuitBreaker()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.cache = CacheTTL(cache_ttl, cache_stale, cache_max)
+        self._em_andamento: dict = {}  # chave -> task da requisição em andamento (single-flight)
+        self.requisicoes_coalescidas = 0
+
+    async def iniciar(self) -> None:
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMITE_TOTAL,
+            limit_per_host=POOL_LIMITE_POR_HOST,
+            keepalive_timeout=POOL_KEEPALIVE_SEGUNDOS,
+            ttl_dns_cache=DNS_CACHE_SEGUNDOS,
+            use_dns_cache=True,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def fechar(self) -> None:
+        for task in list(self._em_andamento.values()):
+            task.cancel()
+        self._em_andamento.clear()
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def obter_score(self, url: str, forcar: bool = False) -> tuple:
+        """
+        Obtém informações do personagem no Raider.IO, usando o cache quando possível
+        Com forcar=True ignora o cache e consulta a API (o resultado ainda é armazenado)
+        Retorna (score, classe, server) ou (None, None, None) se o link/perfil for inválido
+        Levanta RaiderIOIndisponivel se a API estiver fora do ar ou limitando as consultas
+        """
         # Extrai região, reino e nome do URL
-        pattern = r"characters/(\w+)/([^/]+)/([^/]+)"
-        match = re.search(pattern, url)
-        if not match:
+        personagem = extrair_personagem(url)
+        if not personagem:
             return None, None, None
 
-        region, realm, name = match.groups()
-        # Realm pode vir com hífen, padronize para o formato correto
-        realm_api = realm.replace("-", " ").title()
+        chave = chave_personagem(personagem)
+        entrada = None if forcar else self.cache.obter(chave)
+        if entrada is not None:
+            resultado, fresco = entrada
+            if not fresco:
+                self._revalidar(chave, personagem)
+            return resultado
+
+        # shield: se quem chamou for cancelado, a busca compartilhada continua para os demais
+        return await asyncio.shield(self._iniciar_busca(chave, personagem))
+
+    def _iniciar_busca(self, chave: tuple, personagem: tuple) -> asyncio.Task:
+        """
+        Single-flight: garante uma única requisição em andamento por personagem.
+        Chamadas concorrentes para a mesma chave aguardam a mesma task.
+        """
+        task = self._em_andamento.get(chave)
+        if task is not None:
+            self.requisicoes_coalescidas += 1
+            return task
+        task = asyncio.create_task(self._buscar_e_armazenar(chave, personagem))
+        self._em_andamento[chave] = task
+        task.add_done_callback(lambda t: self._finalizar_busca(chave, t))
+        return task
+
+    def _finalizar_busca(self, chave: tuple, task: asyncio.Task) -> None:
+        self._em_andamento.pop(chave, None)
+        # Revalidações em segundo plano não têm quem aguarde: consome a exceção aqui
+        if not task.cancelled() and isinstance(task.exception(), RaiderIOIndisponivel):
+            print(f"[RAIDERIO] Indisponível: {task.exception()}")
+
+    def _revalidar(self, chave: tuple, personagem: tuple) -> None:
+        """Atualiza uma entrada velha do cache em segundo plano"""
+        if chave not in self._em_andamento:
+            self._iniciar_busca(chave, personagem)
+
+    async def _buscar_e_armazenar(self, chave: tuple, personagem: tuple) -> tuple:
+        resultado = await self._buscar(personagem)
+        if resultado[0] is not None:
+            self.cache.definir(chave, resultado)
+        return resultado
+
+    async def _buscar(self, personagem: tuple) -> tuple:
+        """
+        Consulta o perfil diretamente na API do Raider.IO
+        429, 5xx, timeouts e falhas de rede são repetidos com backoff exponencial com jitter,
+        respeitando o Retry-After, até MAX_TENTATIVAS ou PRAZO_TOTAL_SEGUNDOS
+        """
+        if not self.circuito.permitir():
+            RAIDERIO_RESPOSTAS.inc(status="circuito_aberto")
+            raise RaiderIOIndisponivel("circuito aberto")
 
-        # URL da API do Raider.IO
-        api_url = "https://raider.io/api/v1/characters/profile"
+        region, realm, name = personagem
         params = {
             "region": region,
             "realm": realm,
@@ -26,23 +243,95 @@ async def obter_score_raiderio(url: str) -> tuple:
             "fields": "mythic_plus_scores_by_season:current,class"
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url, params=params) as response:
-                if response.status != 200:
-                    return None, None, None
+        if not self.session or self.session.closed:
+            await self.iniciar()
 
-                data = await response.json()
+        prazo = monotonic() + PRAZO_TOTAL_SEGUNDOS
+        motivo = ""
+        # Toda saída registra o resultado no circuito (inclusive cancelamento), senão a
+        # consulta de teste do estado meio-aberto ficaria presa e o circuito nunca fecharia
+        respondeu = False
+        try:
+            for tentativa in range(1, self.max_tentativas + 1):
+                espera = None
+                inicio = perf_counter()
+                try:
+                    async with self.session.get(self.api_url, params=params) as response:
+                        RAIDERIO_RESPOSTAS.inc(status=response.status)
+                        if response.status == 200:
+                            resultado = self._interpretar(await response.json(), realm)
+                            RAIDERIO_SEGUNDOS.observar(perf_counter() - inicio)
+                            respondeu = True
+                            return resultado
 
-                # Score da season atual
-                scores_season = data.get("mythic_plus_scores_by_season", [])
-                current_score = 0
-                if scores_season and "scores" in scores_season[0]:
-                    current_score = scores_season[0]["scores"].get("all", 0)
-                class_name = data.get("class")
-                realm_name = data.get("realm", realm_api)  # Realm pode vir da API ou do link
+                        RAIDERIO_SEGUNDOS.observar(perf_counter() - inicio)
+                        if response.status not in STATUS_TRANSITORIOS:
+                            # 400/404: a API respondeu normalmente, o perfil é que não existe
+                            respondeu = True
+                            return None, None, None
+                        espera = _retry_after(response.headers.get("Retry-After"))
+                        motivo = f"HTTP {response.status}"
+                except asyncio.TimeoutError:
+                    RAIDERIO_SEGUNDOS.observar(perf_counter() - inicio)
+                    RAIDERIO_RESPOSTAS.inc(status="timeout")
+                    motivo = "timeout"
+                except aiohttp.ClientError as e:
+                    RAIDERIO_RESPOSTAS.inc(status="erro")
+                    motivo = repr(e)
+                except ValueError as e:
+                    # 200 com corpo que não é JSON ou não tem o formato esperado
+                    RAIDERIO_SEGUNDOS.observar(perf_counter() - inicio)
+                    RAIDERIO_RESPOSTAS.inc(status="invalida")
+                    motivo = f"resposta inválida ({e})"
 
-                return float(current_score), class_name, realm_name
+                if tentativa == self.max_tentativas:
+                    break
+                if espera is None:
+                    # Full jitter: espalha as novas tentativas de quem falhou ao mesmo tempo
+                    espera = random.uniform(0, min(BACKOFF_MAX_SEGUNDOS, BACKOFF_BASE_SEGUNDOS * 2 ** (tentativa - 1)))
+                if monotonic() + espera >= prazo:
+                    break
+                await asyncio.sleep(espera)
 
-    except Exception as e:
-        print(f"[ERRO RAIDERIO] {e}")
-        return None, None, None
\ No newline at end of file
+            raise RaiderIOIndisponivel(motivo)
+        finally:
+            if respondeu:
+                self.circuito.sucesso()
+            else:
+                self.circuito.falha()
+
+    @staticmethod
+    def _interpretar(data: dict, realm: str) -> tuple:
+        """Extrai (score, classe, server) da resposta da API; levanta ValueError se o formato não bater"""
+        try:
+            # Realm pode vir com hífen, padronize para o formato correto
+            realm_api = realm.replace("-", " ").title()
+
+            # Score da season atual
+            scores_season = data.get("mythic_plus_scores_by_season", [])
+            current_score = 0
+            if scores_season and "scores" in scores_season[0]:
+                current_score = scores_season[0]["scores"].get("all", 0)
+            class_name = data.get("class")
+            realm_name = data.get("realm", realm_api)  # Realm pode vir da API ou do link
+
+            return float(current_score), class_name, realm_name
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"perfil em formato inesperado: {e!r}")
+
+
+async def obter_score_raiderio(url: str, client: Optional[RaiderIOClient] = None) -> tuple:
+    """
+    Obtém informações do personagem no Raider.IO
+    Usa o cliente compartilhado quando informado; senão abre uma sessão temporária.
+    Retorna (score, classe, server) ou (None, None, None) se o perfil for inválido
+    Levanta RaiderIOIndisponivel se a API não responder
+    """
+    if client is not None:
+        return await client.obter_score(url)
+
+    temporario = RaiderIOClient()
+    try:
+        return await temporario.obter_score(url)
+    finally:
+        await temporario.fechar()
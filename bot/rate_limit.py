@@ -0,0 +1,154 @@
+from math import ceil, floor
+from time import monotonic
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class RodaTemporal:
+    """
+    Timing wheel para expiração de chaves.
+    Cada chave fica no compartimento do instante em que expira; avançar o relógio só visita
+    os compartimentos vencidos, então o custo da limpeza é proporcional ao que expirou,
+    não ao total de chaves já vistas.
+    """
+    def __init__(self, horizonte: float, granularidade: float = 1.0, agora: Optional[float] = None):
+        self.granularidade = granularidade
+        self.num_slots = max(1, ceil(horizonte / granularidade) + 1)
+        self._slots: List[Set[Hashable]] = [set() for _ in range(self.num_slots)]
+        self._tick = floor((monotonic() if agora is None else agora) / granularidade)
+
+    def agendar(self, chave: Hashable, expira_em: float) -> None:
+        tick = max(floor(expira_em / self.granularidade), self._tick)
+        self._slots[tick % self.num_slots].add(chave)
+
+    def avancar(self, agora: float) -> List[Hashable]:
+        """Retorna as chaves cujos compartimentos venceram até `agora`"""
+        alvo = floor(agora / self.granularidade)
+        vencidas: List[Hashable] = []
+        # Nunca é preciso dar mais de uma volta completa
+        inicio = max(self._tick, alvo - self.num_slots + 1)
+        for tick in range(inicio, alvo + 1):
+            slot = self._slots[tick % self.num_slots]
+            if slot:
+                vencidas.extend(slot)
+                slot.clear()
+        self._tick = alvo
+        return vencidas
+
+
+class Cooldown:
+    """Cooldown fixo por chave: verificação e registro em O(1), expiração por timing wheel"""
+    def __init__(self, segundos: float, relogio: Callable[[], float] = monotonic):
+        self.segundos = segundos
+        self.relogio = relogio
+        self._expira: Dict[Hashable, float] = {}
+        self._roda = RodaTemporal(segundos, agora=relogio())
+
+    def __len__(self) -> int:
+        return len(self._expira)
+
+    def restante(self, chave: Hashable) -> float:
+        """Segundos até a chave poder agir de novo (0 se já pode)"""
+        expira_em = self._expira.get(chave)
+        if expira_em is None:
+            return 0
+        return max(0.0, expira_em - self.relogio())
+
+    def registrar(self, chave: Hashable) -> None:
+        expira_em = self.relogio() + self.segundos
+        self._expira[chave] = expira_em
+        self._roda.agendar(chave, expira_em)
+
+    def remover(self, chave: Hashable) -> None:
+        """Libera a chave antes do prazo (a entrada na roda é descartada quando vencer)"""
+        self._expira.pop(chave, None)
+
+    def tentar(self, chave: Hashable) -> float:
+        """Se a chave pode agir, registra o uso e retorna 0; senão retorna os segundos restantes"""
+        self.expirar()
+        restante = self.restante(chave)
+        if restante > 0:
+            return restante
+        self.registrar(chave)
+        return 0
+
+    def expirar(self) -> int:
+        agora = self.relogio()
+        removidas = 0
+        for chave in self._roda.avancar(agora):
+            expira_em = self._expira.get(chave)
+            if expira_em is not None and expira_em <= agora:
+                del self._expira[chave]
+                removidas += 1
+            elif expira_em is not None:
+                # Registrada de novo depois de agendada; continua no compartimento novo
+                self._roda.agendar(chave, expira_em)
+        return removidas
+
+
+class JanelaDeslizante:
+    """
+    Limite de eventos por janela de tempo com contador de janela deslizante:
+    guarda só a contagem da janela fixa atual e da anterior e estima a janela deslizante
+    ponderando a anterior pela fração ainda sobreposta. O(1) de memória e tempo por chave.
+    """
+    def __init__(self, limite: int, janela: float, relogio: Callable[[], float] = monotonic):
+        self.limite = limite
+        self.janela = janela
+        self.relogio = relogio
+        # chave -> (início da janela atual, contagem atual, contagem anterior)
+        self._contadores: Dict[Hashable, Tuple[float, int, int]] = {}
+        self._roda = RodaTemporal(2 * janela, granularidade=max(1.0, janela / 60), agora=relogio())
+
+    def __len__(self) -> int:
+        return len(self._contadores)
+
+    def _contador(self, chave: Hashable, agora: float) -> Optional[Tuple[float, int, int]]:
+        contador = self._contadores.get(chave)
+        if contador is None:
+            return None
+        inicio, atual, anterior = contador
+        janelas_passadas = int((agora - inicio) // self.janela)
+        if janelas_passadas == 1:
+            return inicio + self.janela, 0, atual
+        if janelas_passadas > 1:
+            return inicio + janelas_passadas * self.janela, 0, 0
+        return contador
+
+    def contagem(self, chave: Hashable) -> float:
+        """Estimativa de eventos nos últimos `janela` segundos"""
+        agora = self.relogio()
+        contador = self._contador(chave, agora)
+        if contador is None:
+            return 0
+        inicio, atual, anterior = contador
+        sobreposicao = 1 - (agora - inicio) / self.janela
+        return atual + anterior * sobreposicao
+
+    def excedido(self, chave: Hashable) -> bool:
+        return self.contagem(chave) >= self.limite
+
+    def registrar(self, chave: Hashable) -> bool:
+        """Registra um evento e retorna True se a chave atingiu o limite"""
+        agora = self.relogio()
+        self.expirar()
+        contador = self._contador(chave, agora) or (agora, 0, 0)
+        inicio, atual, anterior = contador
+        self._contadores[chave] = (inicio, atual + 1, anterior)
+        # Sem novos eventos, o contador deixa de importar ao fim da janela seguinte
+        self._roda.agendar(chave, inicio + 2 * self.janela)
+        return self.excedido(chave)
+
+    def expirar(self) -> int:
+        agora = self.relogio()
+        removidas = 0
+        for chave in self._roda.avancar(agora):
+            contador = self._contadores.get(chave)
+            if contador is None:
+                continue
+            fim = contador[0] + 2 * self.janela
+            if fim <= agora:
+                del self._contadores[chave]
+                removidas += 1
+            else:
+                self._roda.agendar(chave, fim)
+        return removidas
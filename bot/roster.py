@@ -0,0 +1,352 @@
+"""
+Exportação e importação do roster (tabela jogadores) em CSV ou JSONL.
+
+A exportação lê o banco em lotes (fetchmany) e grava cada lote codificado direto no arquivo,
+sem montar a tabela inteira em memória. A importação grava em lotes com executemany, dentro de
+uma única transação, resolvendo conflitos pela chave única (guild_id, user_id, personagem_nome).
+No arquivo, função, armadura e classe vão por nome e ultima_atualizacao como data UTC
+("AAAA-MM-DD HH:MM:SS"); no banco são códigos (codigos.py) e epoch.
+
+Uso pela linha de comando (a partir da raiz do repositório):
+    python bot/roster.py exportar roster.csv [--guild ID]
+    python bot/roster.py importar roster.jsonl [--guild ID] [--ignorar-existentes]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+import aiosqlite
+from codigos import ARMADURAS, CLASSES, FUNCOES
+
+COLUNAS = (
+    "guild_id", "user_id", "nome", "funcao", "armadura", "disponibilidade", "raiderio_url",
+    "raiderio_score", "personagem_nome", "personagem_classe", "personagem_server", "ultima_atualizacao"
+)
+FORMATOS = {"csv", "jsonl"}
+LOTE = 1000  # Linhas por fetchmany/executemany
+MAX_ERROS_RELATADOS = 10
+
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+SQL_INSERIR = f"""
+    INSERT INTO jogadores ({", ".join(COLUNAS)})
+    VALUES ({", ".join("?" for _ in COLUNAS)})
+    ON CONFLICT(guild_id, user_id, personagem_nome) DO {{acao}}
+"""
+ATUALIZAR = "UPDATE SET " + ", ".join(
+    f"{coluna} = excluded.{coluna}" for coluna in COLUNAS
+    if coluna not in ("guild_id", "user_id", "personagem_nome")
+)
+
+
+class ResultadoImportacao(NamedTuple):
+    lidos: int
+    gravados: int  # Inseridos (e atualizados, se substituir=True)
+    ignorados: int  # Já existiam e não foram alterados
+    erros: List[str]  # "linha N: motivo" das linhas inválidas (as primeiras MAX_ERROS_RELATADOS)
+    invalidos: int
+
+
+def formato_do_arquivo(nome: str, padrao: Optional[str] = None) -> str:
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao == ".csv":
+        return "csv"
+    if extensao in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if padrao in FORMATOS:
+        return padrao
+    raise ValueError(f"Formato não reconhecido para {nome} (use .csv ou .jsonl)")
+
+
+# --- Exportação ---
+
+def cabecalho(formato: str) -> bytes:
+    if formato == "csv":
+        saida = io.StringIO()
+        csv.writer(saida).writerow(COLUNAS)
+        return saida.getvalue().encode("utf-8")
+    return b""
+
+
+def _legivel(linha: tuple) -> tuple:
+    """Linha do banco (na ordem de COLUNAS) com códigos e epoch trocados por nomes e data"""
+    guild_id, user_id, nome, funcao, armadura, disponibilidade, url, score, personagem, classe, server, momento = linha
+    data = None if momento is None else datetime.fromtimestamp(momento, timezone.utc).strftime(FORMATO_DATA)
+    return (
+        guild_id, user_id, nome, FUNCOES.nome(funcao), ARMADURAS.nome(armadura), disponibilidade,
+        url, score, personagem, CLASSES.nome(classe), server, data
+    )
+
+
+def _codificar(formato: str, linhas: Iterable[tuple]) -> bytes:
+    linhas = map(_legivel, linhas)
+    if formato == "csv":
+        saida = io.StringIO()
+        csv.writer(saida).writerows(
+            ["" if valor is None else valor for valor in linha] for linha in linhas
+        )
+        return saida.getvalue().encode("utf-8")
+    return "".join(
+        json.dumps(dict(zip(COLUNAS, linha)), ensure_ascii=False) + "\n" for linha in linhas
+    ).encode("utf-8")
+
+
+async def exportar_roster(
+    db_conn: aiosqlite.Connection,
+    formato: str,
+    guild_id: Optional[int] = None,
+    lote: int = LOTE
+) -> AsyncIterator[bytes]:
+    """Gera o roster codificado em blocos de até `lote` linhas (sem o cabeçalho)"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    sql = f"SELECT {', '.join(COLUNAS)} FROM jogadores"
+    params: tuple = ()
+    if guild_id is not None:
+        sql += " WHERE guild_id = ?"
+        params = (int(guild_id),)
+    cursor = await db_conn.execute(sql + " ORDER BY id", params)
+    try:
+        while True:
+            linhas = await cursor.fetchmany(lote)
+            if not linhas:
+                return
+            yield _codificar(formato, linhas)
+    finally:
+        await cursor.close()
+
+
+async def gravar_exportacao(
+    blocos: AsyncIterator[bytes],
+    formato: str,
+    caminho: str,
+    limite_bytes: Optional[int] = None
+) -> Tuple[List[str], int]:
+    """
+    Grava os blocos em `caminho`; com `limite_bytes`, abre uma nova parte (caminho-2.csv, ...)
+    antes de ultrapassar o limite, cada uma com o seu cabeçalho. A escrita roda fora do event loop.
+    Retorna (arquivos gravados, bytes totais).
+    """
+    base, extensao = os.path.splitext(caminho)
+    topo = cabecalho(formato)
+    arquivos: List[str] = []
+    arquivo = None
+    tamanho = total = 0
+
+    async def nova_parte():
+        nonlocal arquivo, tamanho, total
+        if arquivo is not None:
+            await asyncio.to_thread(arquivo.close)
+        nome = caminho if not arquivos else f"{base}-{len(arquivos) + 1}{extensao}"
+        arquivo = await asyncio.to_thread(open, nome, "wb")
+        arquivos.append(nome)
+        await asyncio.to_thread(arquivo.write, topo)
+        tamanho = len(topo)
+        total += len(topo)
+
+    try:
+        await nova_parte()
+        async for bloco in blocos:
+            # Cada parte recebe ao menos um bloco, mesmo que ele sozinho passe do limite
+            if limite_bytes and tamanho > len(topo) and tamanho + len(bloco) > limite_bytes:
+                await nova_parte()
+            await asyncio.to_thread(arquivo.write, bloco)
+            tamanho += len(bloco)
+            total += len(bloco)
+    finally:
+        if arquivo is not None:
+            await asyncio.to_thread(arquivo.close)
+    return arquivos, total
+
+
+# --- Importação ---
+
+def ler_roster(arquivo: TextIO, formato: str) -> Iterator[Tuple[int, Dict]]:
+    """Lê registros (número da linha, dict) de um arquivo de texto, um por vez"""
+    if formato == "csv":
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+    for numero, linha in enumerate(arquivo, start=1):
+        if linha.strip():
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError as e:
+                registro = {"_erro": f"JSON inválido ({e.msg})"}
+            yield numero, registro
+
+
+def _texto(valor, max_len: int = 200) -> Optional[str]:
+    if valor is None:
+        return None
+    valor = str(valor).strip()[:max_len]
+    return valor or None
+
+
+def _momento(valor) -> Optional[int]:
+    """Epoch de uma data "AAAA-MM-DD[ HH:MM:SS]" (UTC) ou de um número já em epoch"""
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, (int, float)) or str(valor).strip().isdigit():
+        return int(valor)
+    try:
+        data = datetime.fromisoformat(str(valor).strip())
+    except ValueError:
+        raise ValueError(f"ultima_atualizacao inválida: {valor}")
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return int(data.timestamp())
+
+
+def normalizar(registro: Dict, guild_id: Optional[int] = None) -> tuple:
+    """Valida um registro e o converte para a tupla de COLUNAS; levanta ValueError se inválido"""
+    if not isinstance(registro, dict):
+        raise ValueError("registro não é um objeto")
+    if "_erro" in registro:
+        raise ValueError(registro["_erro"])
+    guild = _texto(guild_id if guild_id is not None else registro.get("guild_id"), 20)
+    user_id = _texto(registro.get("user_id"), 20)
+    personagem = _texto(registro.get("personagem_nome"), 50)
+    if not guild or not guild.isdigit():
+        raise ValueError("guild_id ausente ou inválido")
+    if not user_id or not user_id.isdigit():
+        raise ValueError("user_id ausente ou inválido")
+    if not personagem:
+        raise ValueError("personagem_nome ausente")
+
+    funcao = _texto(registro.get("funcao"))
+    if funcao is not None and funcao not in FUNCOES:
+        raise ValueError(f"funcao inválida: {funcao}")
+    armadura = _texto(registro.get("armadura"))
+    if armadura is not None and armadura not in ARMADURAS and armadura != "Unknown":
+        raise ValueError(f"armadura inválida: {armadura}")
+    classe = _texto(registro.get("personagem_classe"), 50)
+    if classe is not None and classe not in CLASSES:
+        raise ValueError(f"personagem_classe inválida: {classe}")
+
+    score = registro.get("raiderio_score")
+    try:
+        score = None if score in (None, "") else float(score)
+    except (TypeError, ValueError):
+        raise ValueError(f"raiderio_score inválido: {score}")
+    disponibilidade = registro.get("disponibilidade")
+    if disponibilidade in (None, ""):
+        disponibilidade = 0
+    elif str(disponibilidade).lower() in ("1", "true", "sim"):
+        disponibilidade = 1
+    elif str(disponibilidade).lower() in ("0", "false", "nao", "não"):
+        disponibilidade = 0
+    else:
+        raise ValueError(f"disponibilidade inválida: {disponibilidade}")
+
+    return (
+        int(guild),
+        int(user_id),
+        _texto(registro.get("nome"), 100),
+        FUNCOES.codigo(funcao),
+        ARMADURAS.codigo(armadura),
+        disponibilidade,
+        _texto(registro.get("raiderio_url")),
+        score,
+        personagem,
+        CLASSES.codigo(classe),
+        _texto(registro.get("personagem_server"), 50),
+        _momento(registro.get("ultima_atualizacao")),
+    )
+
+
+async def importar_roster(
+    db_conn: aiosqlite.Connection,
+    registros: Iterable[Tuple[int, Dict]],
+    guild_id: Optional[int] = None,
+    substituir: bool = True,
+    lote: int = LOTE
+) -> ResultadoImportacao:
+    """
+    Grava os registros em lotes com executemany. Chame dentro de uma transação de escrita
+    (PoolConexoes.escrita): ou o arquivo inteiro entra, ou nada muda.
+    `guild_id` força o servidor de todas as linhas; `substituir` decide se um personagem que
+    já existe é atualizado (True) ou mantido como está (False). Linhas inválidas são puladas.
+    """
+    sql = SQL_INSERIR.format(acao=ATUALIZAR if substituir else "NOTHING")
+    lidos = gravados = invalidos = 0
+    erros: List[str] = []
+    pendentes: List[tuple] = []
+
+    async def gravar():
+        nonlocal gravados
+        cursor = await db_conn.executemany(sql, pendentes)
+        gravados += cursor.rowcount
+        pendentes.clear()
+
+    for numero, registro in registros:
+        lidos += 1
+        try:
+            pendentes.append(normalizar(registro, guild_id))
+        except ValueError as e:
+            invalidos += 1
+            if len(erros) < MAX_ERROS_RELATADOS:
+                erros.append(f"linha {numero or lidos}: {e}")
+            continue
+        if len(pendentes) >= lote:
+            await gravar()
+    if pendentes:
+        await gravar()
+    return ResultadoImportacao(lidos, gravados, lidos - invalidos - gravados, erros, invalidos)
+
+
+def resumo_importacao(resultado: ResultadoImportacao) -> str:
+    texto = (
+        f"{resultado.lidos} linhas lidas: {resultado.gravados} gravadas, "
+        f"{resultado.ignorados} já existentes mantidas, {resultado.invalidos} inválidas"
+    )
+    if resultado.erros:
+        texto += "\n" + "\n".join(resultado.erros)
+    return texto
+
+
+# --- Linha de comando ---
+
+async def _main(args) -> None:
+    from banco import PoolConexoes
+    from migracoes import aplicar_migracoes
+
+    db = PoolConexoes(args.db, leitores=1)
+    await db.abrir()
+    try:
+        async with db.escrita() as conn:
+            await aplicar_migracoes(conn)
+        if args.acao == "exportar":
+            formato = formato_do_arquivo(args.arquivo, args.formato)
+            async with db.leitura() as conn:
+                arquivos, total = await gravar_exportacao(
+                    exportar_roster(conn, formato, args.guild), formato, args.arquivo
+                )
+            print(f"Roster exportado para {', '.join(arquivos)} ({total} bytes)")
+        else:
+            formato = formato_do_arquivo(args.arquivo, args.formato)
+            with open(args.arquivo, "r", encoding="utf-8-sig", newline="") as arquivo:
+                async with db.escrita() as conn:
+                    resultado = await importar_roster(
+                        conn, ler_roster(arquivo, formato), args.guild, substituir=not args.ignorar_existentes
+                    )
+            print(resumo_importacao(resultado))
+    finally:
+        await db.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("acao", choices=("exportar", "importar"))
+    parser.add_argument("arquivo", help="Arquivo .csv ou .jsonl")
+    parser.add_argument("--db", default="data/raiderio.db", help="Banco SQLite do bot")
+    parser.add_argument("--guild", type=int, help="Exporta só este servidor / importa todas as linhas para ele")
+    parser.add_argument("--formato", choices=sorted(FORMATOS), help="Formato, se a extensão não indicar")
+    parser.add_argument("--ignorar-existentes", action="store_true",
+                        help="Na importação, mantém os personagens que já existem em vez de atualizá-los")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,92 @@
+import asyncio
+from time import perf_counter
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+from metricas import TRABALHO_SEGUNDOS
+
+WORKERS = 8  # Trabalhos executados ao mesmo tempo
+TAMANHO_FILA = 200  # Trabalhos aguardando; acima disso novos pedidos são recusados
+PRAZO_SEGUNDOS = 60  # Tempo máximo de um trabalho (o token da interação vale 15 minutos)
+
+
+class Trabalho(NamedTuple):
+    nome: str
+    executar: Callable[[], Awaitable[None]]
+    ao_falhar: Optional[Callable[[], Awaitable[None]]]
+
+
+class PoolTrabalhos:
+    """
+    Pool limitado de workers para a parte lenta das interações (banco + Raider.IO).
+    O handler confirma a interação com defer() e enfileira o trabalho, que responde por
+    follow-up. A fila tem tamanho máximo: sob sobrecarga o pedido é recusado na hora
+    em vez de acumular trabalho que já chegaria tarde demais.
+    """
+    def __init__(self, workers: int = WORKERS, tamanho_fila: int = TAMANHO_FILA, prazo: float = PRAZO_SEGUNDOS):
+        self.workers = workers
+        self.prazo = prazo
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self.tasks: List[asyncio.Task] = []
+        self.em_execucao = 0
+        self.recusados = 0
+
+    def __len__(self) -> int:
+        return self.fila.qsize()
+
+    def cheio(self) -> bool:
+        """True se um enviar() agora seria recusado"""
+        return self.fila.full()
+
+    def iniciar(self) -> None:
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def parar(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def enviar(
+        self,
+        nome: str,
+        executar: Callable[[], Awaitable[None]],
+        ao_falhar: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> bool:
+        """
+        Enfileira `executar()` (a corrotina só é criada quando um worker a pega).
+        `ao_falhar()` roda se o trabalho estourar o prazo ou levantar exceção.
+        Retorna False se a fila está cheia.
+        """
+        try:
+            self.fila.put_nowait(Trabalho(nome, executar, ao_falhar))
+            return True
+        except asyncio.QueueFull:
+            self.recusados += 1
+            return False
+
+    async def aguardar(self) -> None:
+        """Aguarda até a fila esvaziar e os trabalhos em andamento terminarem"""
+        await self.fila.join()
+
+    async def _worker(self) -> None:
+        while True:
+            trabalho = await self.fila.get()
+            self.em_execucao += 1
+            inicio = perf_counter()
+            resultado = "ok"
+            try:
+                await asyncio.wait_for(trabalho.executar(), self.prazo)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                resultado = "prazo" if isinstance(e, asyncio.TimeoutError) else "erro"
+                print(f"[ERRO TRABALHO] {trabalho.nome}: {e!r}")
+                if trabalho.ao_falhar is not None:
+                    try:
+                        await trabalho.ao_falhar()
+                    except Exception as erro:
+                        print(f"[ERRO TRABALHO] {trabalho.nome} (ao avisar a falha): {erro}")
+            finally:
+                self.em_execucao -= 1
+                TRABALHO_SEGUNDOS.observar(perf_counter() - inicio, nome=trabalho.nome, resultado=resultado)
+                self.fila.task_done()